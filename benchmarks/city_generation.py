@@ -0,0 +1,171 @@
+"""City generation scaling benchmark.
+
+Sweeps grid sizes and seeds through CityBuilder.generate_random_city and
+records per-phase wall time, peak traced memory, station/edge counts and
+the JSON and packed binary sizes of every city. Results are written as
+JSON; --compare checks them against a stored baseline run and exits with
+status 1 when any metric regressed beyond --tolerance.
+
+    python benchmarks/city_generation.py --output data/bench.json
+    python benchmarks/city_generation.py --compare data/bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from city_generator.city_builder import CityBuilder
+from city_generator.generation_stats import GenerationStats
+from city_generator.packed_city import pack_city
+
+DEFAULT_GRID_SIZES = [8, 16, 32, 64, 128, 256, 512]
+DEFAULT_SEEDS = [0, 1, 2]
+
+# Metrics compared against a baseline; all of them are "lower is better"
+COMPARED_METRICS = ["seconds", "peak_memory_bytes", "json_bytes", "binary_bytes"]
+
+
+def benchmark_city(grid_size: int, seed: int, repeats: int, options: Dict) -> Dict:
+    """Time one (grid_size, seed) city; the fastest of `repeats` runs counts."""
+    best = None
+    for _ in range(repeats):
+        stats = GenerationStats()
+        start = time.perf_counter()
+        city = CityBuilder(grid_size=grid_size, seed=seed, **options).generate_random_city(stats)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, stats, city)
+    seconds, stats, city = best
+
+    # Peak memory comes from a separate run so tracing does not skew the timings
+    tracemalloc.start()
+    CityBuilder(grid_size=grid_size, seed=seed, **options).generate_random_city()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    builder = CityBuilder(grid_size=grid_size, seed=seed, **options)
+    return {
+        "grid_size": grid_size,
+        "seed": seed,
+        "seconds": seconds,
+        "phases": {name: values["seconds"] for name, values in stats.phases.items()},
+        "peak_memory_bytes": peak_memory,
+        "stations": len(city["stations"]),
+        "edges": len(city["connections"]),
+        "route_stops": sum(len(r["stations"]) for r in city["routes"]),
+        "json_bytes": len(json.dumps(builder.json_city(city), indent=2).encode("utf-8")),
+        "binary_bytes": len(pack_city(city)),
+    }
+
+
+def summarize(runs: List[Dict]) -> Dict[str, Dict]:
+    """Median of every metric per grid size, keyed by str(grid_size)."""
+    summary = {}
+    for grid_size in sorted({run["grid_size"] for run in runs}):
+        group = [run for run in runs if run["grid_size"] == grid_size]
+        phases = sorted({name for run in group for name in run["phases"]})
+        summary[str(grid_size)] = {
+            "seeds": len(group),
+            "seconds": statistics.median(run["seconds"] for run in group),
+            "phases": {name: statistics.median(run["phases"].get(name, 0.0) for run in group) for name in phases},
+            "peak_memory_bytes": statistics.median(run["peak_memory_bytes"] for run in group),
+            "stations": statistics.median(run["stations"] for run in group),
+            "edges": statistics.median(run["edges"] for run in group),
+            "json_bytes": statistics.median(run["json_bytes"] for run in group),
+            "binary_bytes": statistics.median(run["binary_bytes"] for run in group),
+        }
+    return summary
+
+
+def compare(summary: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Describe every metric that got worse than baseline * (1 + tolerance)."""
+    regressions = []
+    for grid_size, current in summary.items():
+        reference = baseline["summary"].get(grid_size)
+        if reference is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = reference[metric], current[metric]
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(f"grid {grid_size}: {metric} {old:.4g} -> {new:.4g} (+{new / old - 1:.1%})")
+    return regressions
+
+
+def print_summary(summary: Dict, baseline: Dict = None):
+    print(f"{'grid':>6}{'seconds':>10}{'vs base':>9}{'peak MB':>10}{'stations':>10}{'edges':>8}"
+          f"{'json KB':>10}{'bin KB':>9}")
+    for grid_size, row in summary.items():
+        change = ""
+        if baseline is not None and grid_size in baseline["summary"]:
+            old = baseline["summary"][grid_size]["seconds"]
+            change = f"{row['seconds'] / old - 1:+.0%}" if old > 0 else ""
+        print(f"{grid_size:>6}{row['seconds']:>10.3f}{change:>9}{row['peak_memory_bytes'] / 1e6:>10.1f}"
+              f"{row['stations']:>10.0f}{row['edges']:>8.0f}{row['json_bytes'] / 1e3:>10.1f}"
+              f"{row['binary_bytes'] / 1e3:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark city generation across grid sizes")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=DEFAULT_GRID_SIZES)
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--repeats", type=int, default=1, help="timed runs per city; the fastest counts")
+    parser.add_argument("--placement", choices=["random", "poisson"], default="random")
+    parser.add_argument("--raster-zones", action="store_true")
+    parser.add_argument("--integer-ids", action="store_true")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown/growth before a metric counts as regressed")
+    args = parser.parse_args()
+
+    options = {"placement": args.placement, "raster_zones": args.raster_zones, "integer_ids": args.integer_ids}
+    runs = []
+    for grid_size in args.grid_sizes:
+        for seed in args.seeds:
+            run = benchmark_city(grid_size, seed, args.repeats, options)
+            runs.append(run)
+            print(f"grid {grid_size:>4} seed {seed}: {run['seconds']:.3f}s, "
+                  f"{run['stations']} stations, {run['edges']} edges")
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": options,
+        "repeats": args.repeats,
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    print()
+    print_summary(results["summary"], baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results["summary"], baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
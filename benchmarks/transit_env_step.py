@@ -0,0 +1,82 @@
+"""TransitEnv step throughput microbenchmark.
+
+Compares the preallocated step/observation path of TransitEnv with the
+previous allocating implementation (LegacyTransitEnv below) on the same
+city and actions, and checks both return identical rewards.
+
+    python benchmarks/transit_env_step.py --grid-size 16 --steps 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from city_generator.city_builder import CityBuilder
+from rl_scheduler.trainer import TransitEnv
+
+
+class LegacyTransitEnv(TransitEnv):
+    """TransitEnv with the old per-step allocations, kept as the benchmark baseline."""
+
+    def reset(self, seed=None, options=None):
+        obs, info = super().reset(seed=seed, options=options)
+        self.passenger_loads = np.zeros(self.tensors.num_stations)
+        return self._get_observation(), info
+
+    def _get_observation(self):
+        obs = np.concatenate([
+            self.passenger_loads,
+            np.array([self.time_step / 288])
+        ])
+        return obs.astype(np.float32)
+
+    def _calculate_wait_times(self, frequencies):
+        return np.sum(60 / (frequencies + 1))
+
+    def _calculate_passengers_reached(self):
+        return np.sum(self.passenger_loads * 0.1)
+
+
+def steps_per_second(env, actions: np.ndarray, steps: int) -> float:
+    env.reset()
+    start = time.perf_counter()
+    for k in range(steps):
+        _, _, terminated, truncated, _ = env.step(actions[k % len(actions)])
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TransitEnv.step throughput")
+    parser.add_argument("--grid-size", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    city = CityBuilder(grid_size=args.grid_size, seed=args.seed).generate_random_city()
+    current, legacy = TransitEnv(city), LegacyTransitEnv(city)
+    rng = np.random.default_rng(args.seed)
+    actions = rng.uniform(1, 60, size=(1024, current.action_space.shape[0])).astype(np.float32)
+
+    # Both paths must agree before their speed is worth comparing
+    current.reset()
+    legacy.reset()
+    for action in actions[:300]:
+        obs, reward, *_ = current.step(action)
+        legacy_obs, legacy_reward, *_ = legacy.step(action)
+        assert reward == legacy_reward and np.array_equal(obs, legacy_obs)
+
+    before = steps_per_second(legacy, actions, args.steps)
+    after = steps_per_second(current, actions, args.steps)
+    print(f"{len(city['stations'])} stations, {args.steps} steps")
+    print(f"legacy:       {before:>10.0f} steps/s")
+    print(f"preallocated: {after:>10.0f} steps/s ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w"):
+    """Open a temporary file that replaces path only once it is completely written.
+
+    The temporary file lives next to path, is flushed and fsynced, then
+    renamed over path with os.replace. If the block raises, path is left
+    untouched and the temporary file is removed, so readers never see a
+    partially written file.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    f = open(tmp_path, mode)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
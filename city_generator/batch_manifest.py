@@ -0,0 +1,87 @@
+import json
+import os
+from typing import Dict, Optional
+
+from city_generator.atomic_file import atomic_open
+
+
+class BatchManifest:
+    """Append-only JSON-lines record of the cities a batch run has finished.
+
+    The first line holds the batch seed and builder options (plus, for a
+    corpus batch, the corpus length when the batch started); every later
+    line records one finished city index with its seed, content hash and
+    output (file name or corpus position). A line is only appended after
+    its city is safely on disk, and a truncated last line left by a crash
+    is ignored on load, so the manifest never claims a city that is
+    missing.
+    """
+
+    def __init__(self, path: str, seed: int, options: Dict, resume: bool = True,
+                 corpus_start: Optional[int] = None):
+        self.path = path
+        self.seed = seed
+        self.options = options
+        self.corpus_start = corpus_start
+        self.completed: Dict[int, Dict] = {}
+
+        if resume and self._load():
+            self._file = open(path, "a")
+        else:
+            header = {"seed": seed, "options": options}
+            if corpus_start is not None:
+                header["corpus_start"] = corpus_start
+            with atomic_open(path) as f:
+                f.write(json.dumps(header) + "\n")
+            self._file = open(path, "a")
+
+    @staticmethod
+    def read_seed(path: str) -> Optional[int]:
+        """Seed of the batch recorded at path, if there is a readable manifest."""
+        try:
+            with open(path, "r") as f:
+                return json.loads(f.readline())["seed"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _load(self) -> bool:
+        """Read completed entries if the manifest at path belongs to this batch."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r") as f:
+            lines = f.read().split("\n")
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return False
+        if header.get("seed") != self.seed or header.get("options") != self.options:
+            return False
+        # The corpus length recorded when the batch started, not the current one
+        self.corpus_start = header.get("corpus_start")
+
+        valid_bytes = len(lines[0]) + 1
+        # The last element is "" after a complete final line, or a partial record
+        for line in lines[1:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            self.completed[entry["index"]] = entry
+            valid_bytes += len(line) + 1
+        # Drop a partial trailing record so new lines start cleanly
+        with open(self.path, "r+") as f:
+            f.truncate(valid_bytes)
+        return True
+
+    def record(self, index: int, seed: int, content_hash: str, output=None, duplicate: bool = False):
+        entry = {"index": index, "seed": seed, "hash": content_hash, "output": output}
+        if duplicate:
+            entry["duplicate"] = True
+        self.completed[index] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
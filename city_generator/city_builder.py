@@ -1,9 +1,29 @@
+import heapq
+import itertools
 import json
+import os
 import random
+import time
 import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
-from collections import defaultdict, deque
+from typing import Iterator, List, Dict, Optional, Tuple
+
+from city_generator.atomic_file import atomic_open
+from city_generator.batch_manifest import BatchManifest
+from city_generator.disjoint_set import DisjointSet
+from city_generator.city_corpus import CityCorpusWriter, corpus_length
+from city_generator.city_editor import CityEditor
+from city_generator.city_graph import CityGraph
+from city_generator.city_hash import city_hash
+from city_generator.generation_stats import GenerationStats, stats_phase
+from city_generator.packed_city import PackedCity, load_packed_city, pack_city, save_packed_city
+from city_generator.route_ordering import nearest_neighbor_order, two_opt
+from city_generator.station_ids import externalize_station_ids, intern_station_ids
+from city_generator.travel_times import cached_travel_times, compute_travel_times
+from city_generator.spatial import DistanceRaster, SpatialGrid, colocated_transfers, manhattan_mst_candidates
+from city_generator.zone_raster import ZoneRaster
 
 @dataclass
 class Station:
@@ -20,16 +40,40 @@ class Zone:
     zone_type: str  # residential, commercial, industrial
 
 class CityBuilder:
-    def __init__(self, grid_size: int = 8):
+    def __init__(self, grid_size: int = 8, placement: str = "random", raster_zones: bool = False,
+                 seed: Optional[int] = None, integer_ids: bool = False, route_two_opt: int = 0):
         self.grid_size = grid_size
+        # Seeded builders own their RNG; unseeded ones share the random module
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
+        # Station placement: "random" rejection sampling or "poisson" disk sampling
+        self.placement = placement
+        # Keep zones as a ZoneRaster instead of one dict per cell
+        self.raster_zones = raster_zones
+        # Dense integer station IDs internally; strings only in saved JSON
+        self.integer_ids = integer_ids
+        # Bounded 2-opt passes applied to nearest-neighbour route orders (0 = off)
+        self.route_two_opt = route_two_opt
         self.zone_types = ["residential", "commercial", "industrial"]
         self.station_types = ["bus", "tram", "metro"]
     
-    def generate_random_city(self) -> Dict:
-        zones = self._generate_zones()
-        stations = self._generate_stations()
-        connections = self._generate_connections(stations)
-        routes = self._generate_routes(stations)
+    def generate_random_city(self, stats: Optional[GenerationStats] = None) -> Dict:
+        """Generate a city; pass a GenerationStats to record per-phase costs."""
+        with stats_phase(stats, "zones"):
+            zones = self._generate_zones()
+        with stats_phase(stats, "stations"):
+            stations = self._generate_stations()
+        with stats_phase(stats, "connections"):
+            connections = self._generate_connections(stations, stats)
+        with stats_phase(stats, "routes"):
+            routes = self._generate_routes(stations)
+        
+        if stats is not None:
+            stats.cities += 1
+            stats.add_output("zones", len(zones))
+            stats.add_output("stations", len(stations))
+            stats.add_output("connections", len(connections))
+            stats.add_output("routes", sum(len(r["stations"]) for r in routes))
         
         return {
             "grid_size": self.grid_size,
@@ -39,34 +83,36 @@ class CityBuilder:
             "routes": routes
         }
     
-    def _generate_zones(self) -> List[Dict]:
-        zones = []
-        grid = [[None for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+    def _generate_zones(self):
+        """Generate the zone grid as a uint8 raster of zone_types codes.
+
+        Returns a ZoneRaster when raster_zones is set, otherwise the legacy
+        list of {"x", "y", "type"} dicts.
+        """
+        unassigned = 255
+        codes = np.full((self.grid_size, self.grid_size), unassigned, dtype=np.uint8)
         
         # Create zone clusters instead of random placement
         cluster_size = max(2, self.grid_size // 3)
         
-        for zone_type in self.zone_types:
+        for code, zone_type in enumerate(self.zone_types):
             # Pick random center for each zone type
-            center_x = random.randint(cluster_size//2, self.grid_size - cluster_size//2 - 1)
-            center_y = random.randint(cluster_size//2, self.grid_size - cluster_size//2 - 1)
+            center_x = self.rng.randint(cluster_size//2, self.grid_size - cluster_size//2 - 1)
+            center_y = self.rng.randint(cluster_size//2, self.grid_size - cluster_size//2 - 1)
             
-            # Fill cluster around center
-            for dx in range(-cluster_size//2, cluster_size//2 + 1):
-                for dy in range(-cluster_size//2, cluster_size//2 + 1):
-                    x, y = center_x + dx, center_y + dy
-                    if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
-                        if grid[x][y] is None:
-                            grid[x][y] = zone_type
+            # Fill unclaimed cells of the cluster around center
+            x0, x1 = max(0, center_x - cluster_size//2 - cluster_size % 2), center_x + cluster_size//2 + 1
+            y0, y1 = max(0, center_y - cluster_size//2 - cluster_size % 2), center_y + cluster_size//2 + 1
+            cluster = codes[x0:x1, y0:y1]
+            cluster[cluster == unassigned] = code
         
         # Fill remaining cells with random zones
-        for x in range(self.grid_size):
-            for y in range(self.grid_size):
-                if grid[x][y] is None:
-                    grid[x][y] = random.choice(self.zone_types)
-                zones.append({"x": x, "y": y, "type": grid[x][y]})
+        remaining = codes == unassigned
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        codes[remaining] = rng.integers(0, len(self.zone_types), size=int(remaining.sum()), dtype=np.uint8)
         
-        return zones
+        zones = ZoneRaster(codes, self.zone_types)
+        return zones if self.raster_zones else zones.to_dicts()
     
     def _generate_stations(self) -> List[Dict]:
         stations = []
@@ -87,30 +133,61 @@ class CityBuilder:
         # Minimum distance between stations to prevent clustering
         min_distance = max(2, self.grid_size // 6)
         
-        def is_too_close(x, y, existing_positions, min_dist):
-            """Check if position is too close to existing stations."""
-            for ex_x, ex_y in existing_positions:
-                if abs(x - ex_x) + abs(y - ex_y) < min_dist:
-                    return True
-            return False
+        # Distance raster over placed positions so checks are a single lookup
+        position_index = DistanceRaster(self.grid_size, min_distance)
         
-        def find_good_position(existing_positions, min_dist, max_attempts=50):
+        def find_good_position(max_attempts=50):
             """Find a position that's not too close to existing stations."""
-            for _ in range(max_attempts):
-                x = random.randint(0, self.grid_size - 1)
-                y = random.randint(0, self.grid_size - 1)
-                if not is_too_close(x, y, existing_positions, min_dist):
-                    return x, y
+            # Once every cell is blocked no attempt can succeed, so skip them
+            if position_index.free_cells > 0:
+                for _ in range(max_attempts):
+                    x = self.rng.randint(0, self.grid_size - 1)
+                    y = self.rng.randint(0, self.grid_size - 1)
+                    if not position_index.is_too_close(x, y):
+                        return x, y
             # If we can't find a good position, return a random one
-            return random.randint(0, self.grid_size - 1), random.randint(0, self.grid_size - 1)
+            return self.rng.randint(0, self.grid_size - 1), self.rng.randint(0, self.grid_size - 1)
+        
+        def find_poisson_position(active, max_attempts=30):
+            """Grow a Poisson-disk sample from the active positions."""
+            spacing = max(1, position_index.min_dist)
+            while active and position_index.free_cells > 0:
+                k = self.rng.randrange(len(active))
+                ax, ay = active[k]
+                for _ in range(max_attempts):
+                    # Random point on a Manhattan ring between spacing and 2 * spacing
+                    r = self.rng.randint(spacing, 2 * spacing)
+                    dx = self.rng.randint(-r, r)
+                    dy = (r - abs(dx)) * self.rng.choice((-1, 1))
+                    x, y = ax + dx, ay + dy
+                    if (0 <= x < self.grid_size and 0 <= y < self.grid_size
+                            and not position_index.is_too_close(x, y)):
+                        return x, y
+                # Nothing fits around this point anymore
+                active[k] = active[-1]
+                active.pop()
+            return find_good_position()
+        
+        def next_position(active):
+            if self.placement == "poisson" and station_positions:
+                position = find_poisson_position(active)
+            else:
+                position = find_good_position()
+            active.append(position)
+            return position
+        
+        def add_position(x, y):
+            station_positions.append((x, y))
+            position_index.insert(x, y)
         
         # First place metro stations (major hubs) with good distribution
+        active = []
         for _ in range(station_counts["metro"]):
-            x, y = find_good_position(station_positions, min_distance)
-            station_positions.append((x, y))
+            x, y = next_position(active)
+            add_position(x, y)
             
             stations.append({
-                "id": f"station_{station_id}",
+                "id": station_id if self.integer_ids else f"station_{station_id}",
                 "x": x, "y": y,
                 "type": "metro",
                 "is_transfer": False  # Will be set later in connections
@@ -119,17 +196,19 @@ class CityBuilder:
         
         # Place tram stations (some at metro locations for transfers)
         transfer_chance = 0.4  # 40% chance of placing at existing metro location
+        active = list(station_positions)
+        position_index.set_min_distance(min_distance // 2)
         for i in range(station_counts["tram"]):
-            if i < len(station_positions) and random.random() < transfer_chance:
+            if i < len(station_positions) and self.rng.random() < transfer_chance:
                 # Place at existing metro location for transfer
                 x, y = station_positions[i]
             else:
                 # Place at new location with smaller minimum distance
-                x, y = find_good_position(station_positions, min_distance // 2)
-                station_positions.append((x, y))
+                x, y = next_position(active)
+                add_position(x, y)
             
             stations.append({
-                "id": f"station_{station_id}",
+                "id": station_id if self.integer_ids else f"station_{station_id}",
                 "x": x, "y": y,
                 "type": "tram",
                 "is_transfer": False
@@ -137,17 +216,19 @@ class CityBuilder:
             station_id += 1
         
         # Place bus stations (more distributed, some at major hubs)
+        active = list(station_positions)
+        position_index.set_min_distance(min_distance // 3)
         for i in range(station_counts["bus"]):
-            if i < len(station_positions) and random.random() < 0.3:
+            if i < len(station_positions) and self.rng.random() < 0.3:
                 # Place at existing location for transfer
                 x, y = station_positions[i % len(station_positions)]
             else:
                 # Place at new location with even smaller minimum distance
-                x, y = find_good_position(station_positions, min_distance // 3)
-                station_positions.append((x, y))
+                x, y = next_position(active)
+                add_position(x, y)
             
             stations.append({
-                "id": f"station_{station_id}",
+                "id": station_id if self.integer_ids else f"station_{station_id}",
                 "x": x, "y": y,
                 "type": "bus",
                 "is_transfer": False
@@ -156,85 +237,119 @@ class CityBuilder:
         
         return stations
     
-    def _generate_connections(self, stations: List[Dict]) -> List[Dict]:
+    def _generate_connections(self, stations: List[Dict],
+                              stats: Optional[GenerationStats] = None) -> List[Dict]:
         connections = []
         
-        # Create transfer connections for co-located stations
-        location_groups = {}
-        for station in stations:
-            loc = (station["x"], station["y"])
-            if loc not in location_groups:
-                location_groups[loc] = []
-            location_groups[loc].append(station)
-        
-        # Mark transfer stations and create connections
-        for loc, group in location_groups.items():
-            if len(group) > 1:
-                # Mark all stations at this location as transfer stations
-                for station in group:
-                    station["is_transfer"] = True
-                
-                # Create connections between different modes at same location
-                for i, s1 in enumerate(group):
-                    for s2 in group[i+1:]:
-                        if s1["type"] != s2["type"]:
-                            connections.append({
-                                "from": s1["id"],
-                                "to": s2["id"],
-                                "walk_time": 2  # Quick transfer
-                            })
-        
-        # Ensure network connectivity with MST approach
-        connected = set()
-        if stations:
-            connected.add(stations[0]["id"])
-        
-        while len(connected) < len(stations):
-            min_dist = float('inf')
-            best_pair = None
+        # Track connected components and existing edges incrementally
+        station_index = {s["id"]: i for i, s in enumerate(stations)}
+        components = DisjointSet(len(stations))
+        edges = set()  # canonical (low, high) station index pairs
+        
+        def add_connection(i, j, walk_time):
+            connections.append({
+                "from": stations[i]["id"],
+                "to": stations[j]["id"],
+                "walk_time": walk_time
+            })
+            components.union(i, j)
+            edges.add((i, j) if i < j else (j, i))
+        
+        def record_added(phase, before):
+            if stats is not None:
+                stats.add_output(phase, len(connections) - before)
+        
+        with stats_phase(stats, "connections.transfers"):
+            # Group co-located stations in one sort over the coordinate arrays
+            type_codes = {station_type: code for code, station_type in enumerate(self.station_types)}
+            is_transfer, pair_i, pair_j = colocated_transfers(
+                np.array([s["x"] for s in stations]),
+                np.array([s["y"] for s in stations]),
+                np.array([type_codes[s["type"]] for s in stations])
+            )
             
-            for s1 in stations:
-                if s1["id"] in connected:
-                    for s2 in stations:
-                        if s2["id"] not in connected:
-                            dist = abs(s1["x"] - s2["x"]) + abs(s1["y"] - s2["y"])
-                            if dist < min_dist:
-                                min_dist = dist
-                                best_pair = (s1, s2)
+            # Mark all stations sharing a location as transfer stations
+            for i in np.flatnonzero(is_transfer).tolist():
+                stations[i]["is_transfer"] = True
             
-            if best_pair:
-                s1, s2 = best_pair
-                connections.append({
-                    "from": s1["id"],
-                    "to": s2["id"], 
-                    "walk_time": min_dist * 120  # 2 minutes per grid unit
-                })
-                connected.add(s2["id"])
-        
-        # Add walking connections for nearby different-mode stations
-        for i, s1 in enumerate(stations):
-            for j, s2 in enumerate(stations[i+1:], i+1):
-                if s1["type"] == s2["type"]:
-                    continue
+            # Quick transfers between different modes at the same location
+            for i, j in zip(pair_i.tolist(), pair_j.tolist()):
+                add_connection(i, j, 2)
+        record_added("connections.transfers", 0)
+        
+        before = len(connections)
+        with stats_phase(stats, "connections.mst"):
+            # Ensure network connectivity with MST approach
+            for conn in self._minimum_spanning_connections(stations):
+                add_connection(station_index[conn["from"]], station_index[conn["to"]], conn["walk_time"])
+        record_added("connections.mst", before)
+        
+        before = len(connections)
+        with stats_phase(stats, "connections.walking"):
+            # Add walking connections for nearby different-mode stations
+            nearby_index = SpatialGrid(3)
+            for i, station in enumerate(stations):
+                nearby_index.insert(station["x"], station["y"], i)
+            
+            for i, s1 in enumerate(stations):
+                nearby = sorted(j for j in nearby_index.within(s1["x"], s1["y"], 2) if j > i)
+                for j in nearby:
+                    s2 = stations[j]
+                    if s1["type"] == s2["type"]:
+                        continue
                     
-                distance = abs(s1["x"] - s2["x"]) + abs(s1["y"] - s2["y"])
-                if distance <= 2:
                     # Check if connection doesn't already exist
-                    existing = any(
-                        (c["from"] == s1["id"] and c["to"] == s2["id"]) or
-                        (c["from"] == s2["id"] and c["to"] == s1["id"])
-                        for c in connections
-                    )
-                    if not existing:
+                    if (i, j) not in edges:
+                        distance = abs(s1["x"] - s2["x"]) + abs(s1["y"] - s2["y"])
                         walk_time = max(3, int(distance * 100 / 60))  # ~100m per grid, 60m/min walking
-                        connections.append({
-                            "from": s1["id"],
-                            "to": s2["id"],
-                            "walk_time": walk_time
-                        })
+                        add_connection(i, j, walk_time)
+        record_added("connections.walking", before)
         
-        # Ensure all stations are connected
-        connections = self._ensure_connectivity(stations, connections)
+        before = len(connections)
+        with stats_phase(stats, "connections.repair"):
+            # Ensure all stations are connected
+            connections = self._ensure_connectivity(stations, connections, components)
+        record_added("connections.repair", before)
+        
+        return connections
+    
+    def _minimum_spanning_connections(self, stations: List[Dict]) -> List[Dict]:
+        """Connect all stations with a Manhattan MST grown from the first station.
+
+        Prim's algorithm runs over the octant nearest-neighbour candidates with
+        a heap, so each step pops the closest connected/unconnected pair
+        instead of rescanning every pair.
+        """
+        if not stations:
+            return []
+        
+        xs = [s["x"] for s in stations]
+        ys = [s["y"] for s in stations]
+        
+        neighbors = [[] for _ in stations]
+        for dist, i, j in manhattan_mst_candidates(xs, ys):
+            neighbors[i].append((dist, j))
+            neighbors[j].append((dist, i))
+        
+        connections = []
+        connected = [False] * len(stations)
+        connected[0] = True
+        heap = [(dist, 0, j) for dist, j in neighbors[0]]
+        heapq.heapify(heap)
+        
+        while heap:
+            dist, i, j = heapq.heappop(heap)
+            if connected[j]:
+                continue
+            connected[j] = True
+            connections.append({
+                "from": stations[i]["id"],
+                "to": stations[j]["id"],
+                "walk_time": dist * 120  # 2 minutes per grid unit
+            })
+            for next_dist, k in neighbors[j]:
+                if not connected[k]:
+                    heapq.heappush(heap, (next_dist, j, k))
         
         return connections
     
@@ -371,19 +486,18 @@ class CityBuilder:
         if len(stations) <= 2:
             return stations
         
+        xs = [s["x"] for s in stations]
+        ys = [s["y"] for s in stations]
+        
         # Start from the leftmost station
-        ordered = [min(stations, key=lambda s: s["x"])]
-        remaining = [s for s in stations if s != ordered[0]]
-        
-        # Use nearest neighbor algorithm (fast and simple)
-        while remaining:
-            current = ordered[-1]
-            nearest = min(remaining, key=lambda s: 
-                         abs(s["x"] - current["x"]) + abs(s["y"] - current["y"]))
-            ordered.append(nearest)
-            remaining.remove(nearest)
-        
-        return ordered
+        start = min(range(len(stations)), key=lambda i: xs[i])
+        
+        # Use nearest neighbor algorithm over a spatial index (fast and simple)
+        order = nearest_neighbor_order(xs, ys, start)
+        if self.route_two_opt:
+            order = two_opt(xs, ys, order, max_passes=self.route_two_opt)
+        
+        return [stations[i] for i in order]
     
     def _get_route_color(self, mode: str, route_num: int) -> str:
         # Color schemes for different modes
@@ -396,117 +510,310 @@ class CityBuilder:
         mode_colors = colors.get(mode, ["#000000"])
         return mode_colors[route_num % len(mode_colors)]
     
+    def json_city(self, city_data: Dict) -> Dict:
+        """The JSON-serializable form of a city, as written by save_city."""
+        city_data = externalize_station_ids(city_data)
+        zones = city_data.get("zones")
+        if isinstance(zones, ZoneRaster):
+            # Raster cities store one code string per row instead of a dict per cell
+            city_data = {k: v for k, v in city_data.items() if k != "zones"}
+            city_data["zone_raster"] = zones.to_json()
+        return city_data
+    
     def save_city(self, city_data: Dict, filename: str):
         filepath = f"data/{filename}"
-        with open(filepath, 'w') as f:
-            json.dump(city_data, f, indent=2)
+        with atomic_open(filepath, 'w') as f:
+            json.dump(self.json_city(city_data), f, indent=2)
     
-    def load_city(self, filename: str) -> Dict:
-        filepath = f"data/{filename}"
+    def load_city(self, filename: str, data_dir: str = "data") -> Dict:
+        filepath = f"{data_dir}/{filename}"
         with open(filepath, 'r') as f:
-            return json.load(f)
+            city_data = json.load(f)
+        if "zone_raster" in city_data:
+            city_data["zones"] = ZoneRaster.from_json(city_data.pop("zone_raster"))
+        if self.integer_ids:
+            city_data = intern_station_ids(city_data)
+        return city_data
+    
+    def edit_city(self, city_data: Dict) -> CityEditor:
+        """Start an incremental edit session on a generated city."""
+        return CityEditor(city_data)
     
-    def generate_batch_cities(self, count: int = 100):
-        # Generate hundreds of cities for training
-        for i in range(count):
-            city = self.generate_random_city()
-            self.save_city(city, f"city_{i:03d}.json")
+    def save_city_binary(self, city_data: Dict, filename: str):
+        """Save a city in the packed binary format (e.g. city_000.city)."""
+        save_packed_city(city_data, f"data/{filename}")
     
-    def _verify_connectivity(self, stations: List[Dict], connections: List[Dict]) -> bool:
+    def load_city_binary(self, filename: str, mmap: bool = True) -> PackedCity:
+        """Open a packed city as a lazy, memory-mapped dict view."""
+        return load_packed_city(f"data/{filename}", mmap=mmap)
+    
+    def travel_times(self, city_data: Dict, filename: Optional[str] = None, dtype=np.float32) -> np.ndarray:
+        """All-pairs station travel times, cached in data/<filename> (e.g. city_000.travel.npz).
+
+        The cache is keyed on the city's content hash and rebuilt when the
+        city has changed since it was written.
+        """
+        if filename is None:
+            return compute_travel_times(city_data, dtype=dtype)
+        return cached_travel_times(city_data, f"data/{filename}", dtype=dtype)
+    
+    def _builder_options(self) -> Dict:
+        """Constructor arguments needed to rebuild this builder in a worker."""
+        return {
+            "grid_size": self.grid_size,
+            "placement": self.placement,
+            "raster_zones": self.raster_zones,
+            "integer_ids": self.integer_ids,
+            "route_two_opt": self.route_two_opt
+        }
+    
+    def _worker_options(self) -> Dict:
+        """Constructor arguments for rebuilding this builder inside a pool worker process."""
+        return self._builder_options()
+    
+    def generate_batch_cities(self, count: int = 100, workers: Optional[int] = 1,
+                              seed: Optional[int] = None, report_every: Optional[int] = None,
+                              corpus: Optional[str] = None,
+                              stats: Optional[GenerationStats] = None,
+                              skip_duplicates: bool = False, resume: bool = False) -> Dict:
+        """Generate hundreds of cities for training as data/city_000.json, ...
+
+        Every city gets its own RNG seeded from (seed, index), so a batch is
+        reproducible for a given seed whatever the number of workers.
+        workers=None uses every core; workers=1 generates in this process.
+        With corpus set, cities are appended in index order to the packed
+        corpus data/<corpus>/ instead of being written as JSON files.
+        Per-phase costs of every city are merged into stats when given.
+        With skip_duplicates, a city whose content hash (city_hash) matches
+        an earlier city of the batch is dropped, leaving no file or corpus
+        entry for its index.
+        
+        Files are written atomically and every finished city is recorded in
+        a manifest (data/batch_manifest.jsonl, or manifest.jsonl inside the
+        corpus) with its seed and hash. Without resume every call starts a
+        new batch. With resume, a run whose manifest matches the seed and
+        builder options (seed=None adopts the manifest's seed) only
+        generates the indices that are not recorded or whose file is gone.
+        """
+        options = self._builder_options()
+        builder_class = type(self)
+        if corpus is None:
+            manifest_path = "data/batch_manifest.jsonl"
+        else:
+            os.makedirs(f"data/{corpus}", exist_ok=True)
+            manifest_path = f"data/{corpus}/manifest.jsonl"
+        if seed is None:
+            if resume:
+                seed = BatchManifest.read_seed(manifest_path)
+            if seed is None:
+                seed = self.rng.getrandbits(64)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if report_every is None:
+            report_every = max(1, count // 10)
+        
+        corpus_start = corpus_length(f"data/{corpus}") if corpus is not None else None
+        manifest = BatchManifest(manifest_path, seed, options, resume=resume, corpus_start=corpus_start)
+        completed = manifest.completed
+        if corpus is None:
+            # A city file removed since it was recorded is generated again
+            for index, entry in list(completed.items()):
+                if entry["output"] is not None and not os.path.exists(f"data/{entry['output']}"):
+                    del completed[index]
+        seen_hashes = {entry["hash"] for entry in completed.values() if not entry.get("duplicate")}
+        pending = [i for i in range(count) if i not in completed]
+        seeds = [city_seed(seed, i) for i in pending]
+        if corpus is None:
+            writer = None
+            filenames = [f"city_{i:03d}.json" for i in pending]
+        else:
+            # Cut off cities appended after the last manifest entry by an interrupted run
+            kept = [entry["output"] for entry in completed.values() if entry["output"] is not None]
+            writer = CityCorpusWriter(f"data/{corpus}", keep=max(kept) + 1 if kept else manifest.corpus_start)
+            filenames = [None] * len(pending)
+        
+        resumed = count - len(pending)
+        if resumed:
+            print(f"Resuming batch: {resumed}/{count} cities already done")
+        
+        start = time.perf_counter()
+        
+        def report(done):
+            elapsed = time.perf_counter() - start
+            rate = (done - resumed) / elapsed if elapsed > 0 else 0.0
+            print(f"Generated {done}/{count} cities ({rate:.1f} cities/s)")
+        
+        done = resumed
+        
+        def collect(index, city_seed_value, result):
+            nonlocal done
+            output, city_stats, content_hash = result
+            if city_stats is not None:
+                stats.merge(city_stats)
+            done += 1
+            if skip_duplicates and content_hash in seen_hashes:
+                if writer is None:
+                    os.remove(f"data/{output}")
+                manifest.record(index, city_seed_value, content_hash, duplicate=True)
+            else:
+                seen_hashes.add(content_hash)
+                if writer is not None:
+                    output = writer.append_packed(output)
+                    writer.flush()
+                manifest.record(index, city_seed_value, content_hash, output)
+            if done % report_every == 0 or done == count:
+                report(done)
+        
+        try:
+            if workers <= 1:
+                for index, city_seed_value, filename in zip(pending, seeds, filenames):
+                    collect(index, city_seed_value,
+                            _generate_batch_city(options, city_seed_value, filename, stats is not None, True,
+                                                 builder_class))
+            elif pending:
+                chunksize = max(1, len(pending) // (workers * 8))
+                worker_options = self._worker_options()
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = executor.map(_generate_batch_city, [worker_options] * len(pending), seeds,
+                                           filenames, [stats is not None] * len(pending), [True] * len(pending),
+                                           [builder_class] * len(pending), chunksize=chunksize)
+                    for index, city_seed_value, result in zip(pending, seeds, results):
+                        collect(index, city_seed_value, result)
+        finally:
+            if writer is not None:
+                writer.close()
+            manifest.close()
+        
+        elapsed = time.perf_counter() - start
+        entries = [completed[i] for i in range(count) if i in completed]
+        duplicates = sum(1 for entry in entries if entry.get("duplicate"))
+        return {
+            "count": len(entries) - duplicates,
+            "duplicates": duplicates,
+            "resumed": resumed,
+            "seed": seed,
+            "workers": workers,
+            "seconds": elapsed,
+            "cities_per_second": (done - resumed) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def iter_cities(self, seed: Optional[int] = None, count: Optional[int] = None, prefetch: int = 0,
+                    workers: Optional[int] = None, compiled: bool = False) -> Iterator:
+        """Yield freshly generated cities without going through data/.
+
+        City i is generated from city_seed(seed, i), exactly like index i of
+        generate_batch_cities, so a stream is reproducible and matches a
+        batch with the same seed. count=None streams forever. With
+        compiled, CityGraph objects are yielded instead of city dicts.
+        
+        With prefetch > 0, a background pool of worker processes (workers,
+        default every core) keeps up to prefetch cities generated ahead of
+        the consumer; otherwise each city is generated on demand in this
+        process. Closing the generator cancels any prefetched work.
+        """
+        if seed is None:
+            seed = self.rng.getrandbits(64)
+        options = self._builder_options()
+        builder_class = type(self)
+        indices = itertools.count() if count is None else iter(range(count))
+        
+        if prefetch <= 0:
+            for i in indices:
+                yield _generate_stream_city(options, city_seed(seed, i), compiled, builder_class)
+            return
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        options = self._worker_options()
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pending = deque()
+        try:
+            # Keep the queue full: one new city is submitted for every city consumed
+            for i in itertools.islice(indices, prefetch):
+                pending.append(executor.submit(_generate_stream_city, options, city_seed(seed, i), compiled,
+                                               builder_class))
+            while pending:
+                city = pending.popleft().result()
+                for i in itertools.islice(indices, 1):
+                    pending.append(executor.submit(_generate_stream_city, options, city_seed(seed, i), compiled,
+                                                   builder_class))
+                yield city
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _station_components(self, stations: List[Dict], connections: List[Dict]) -> DisjointSet:
+        """Build the union-find of station components for a connection list."""
+        station_index = {s["id"]: i for i, s in enumerate(stations)}
+        components = DisjointSet(len(stations))
+        for conn in connections:
+            a = station_index.get(conn["from"])
+            b = station_index.get(conn["to"])
+            if a is not None and b is not None:
+                components.union(a, b)
+        return components
+    
+    def _verify_connectivity(self, stations: List[Dict], connections: List[Dict],
+                             components: Optional[DisjointSet] = None) -> bool:
         """Verify that all stations are connected in the network."""
         if not stations:
             return True
-            
-        # Build adjacency list
-        graph = defaultdict(set)
-        for conn in connections:
-            graph[conn["from"]].add(conn["to"])
-            graph[conn["to"]].add(conn["from"])
-        
-        # BFS to find all reachable stations
-        start_station = stations[0]["id"]
-        visited = set()
-        queue = deque([start_station])
-        visited.add(start_station)
-        
-        while queue:
-            current = queue.popleft()
-            for neighbor in graph[current]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-        
-        # Check if all stations are reachable
-        all_station_ids = {station["id"] for station in stations}
-        return len(visited) == len(all_station_ids)
+        
+        if components is None:
+            components = self._station_components(stations, connections)
+        return components.count == 1
     
-    def _ensure_connectivity(self, stations: List[Dict], connections: List[Dict]) -> List[Dict]:
-        """Ensure all stations are connected by adding minimum necessary connections."""
-        if self._verify_connectivity(stations, connections):
+    def _ensure_connectivity(self, stations: List[Dict], connections: List[Dict],
+                             components: Optional[DisjointSet] = None) -> List[Dict]:
+        """Ensure all stations are connected by adding minimum necessary connections.
+
+        Remaining components are bridged Kruskal-style over the octant
+        nearest-neighbour candidates, which always contain a closest pair
+        across any split of the stations.
+        """
+        if components is None:
+            components = self._station_components(stations, connections)
+        if self._verify_connectivity(stations, connections, components):
             return connections
         
-        # Build adjacency list
-        graph = defaultdict(set)
-        for conn in connections:
-            graph[conn["from"]].add(conn["to"])
-            graph[conn["to"]].add(conn["from"])
-        
-        # Find connected components
-        visited = set()
-        components = []
+        xs = [s["x"] for s in stations]
+        ys = [s["y"] for s in stations]
         
-        for station in stations:
-            station_id = station["id"]
-            if station_id not in visited:
-                # BFS to find this component
-                component = set()
-                queue = deque([station_id])
-                visited.add(station_id)
-                component.add(station_id)
-                
-                while queue:
-                    current = queue.popleft()
-                    for neighbor in graph[current]:
-                        if neighbor not in visited:
-                            visited.add(neighbor)
-                            queue.append(neighbor)
-                            component.add(neighbor)
-                
-                components.append(component)
-        
-        # Connect components by adding edges between closest stations
-        station_dict = {s["id"]: s for s in stations}
-        
-        while len(components) > 1:
-            min_dist = float('inf')
-            best_connection = None
-            comp1_idx = 0
-            comp2_idx = 1
-            
-            # Find closest pair between different components
-            for i, comp1 in enumerate(components):
-                for j, comp2 in enumerate(components[i+1:], i+1):
-                    for s1_id in comp1:
-                        for s2_id in comp2:
-                            s1 = station_dict[s1_id]
-                            s2 = station_dict[s2_id]
-                            dist = abs(s1["x"] - s2["x"]) + abs(s1["y"] - s2["y"])
-                            if dist < min_dist:
-                                min_dist = dist
-                                best_connection = (s1_id, s2_id)
-                                comp1_idx = i
-                                comp2_idx = j
-            
-            if best_connection:
-                s1_id, s2_id = best_connection
+        for dist, i, j in sorted(manhattan_mst_candidates(xs, ys)):
+            if components.union(i, j):
                 connections.append({
-                    "from": s1_id,
-                    "to": s2_id,
-                    "walk_time": min_dist * 120  # 2 minutes per grid unit
+                    "from": stations[i]["id"],
+                    "to": stations[j]["id"],
+                    "walk_time": dist * 120  # 2 minutes per grid unit
                 })
-                
-                # Merge the two components
-                components[comp1_idx].update(components[comp2_idx])
-                components.pop(comp2_idx)
+                if components.count == 1:
+                    break
         
         return connections
+
+def city_seed(batch_seed: int, index: int) -> int:
+    """Derive the RNG seed of city `index` in the batch seeded with batch_seed."""
+    return int(np.random.SeedSequence([batch_seed, index]).generate_state(1, np.uint64)[0])
+
+def _generate_stream_city(options: Dict, seed: int, compiled: bool = False, builder_class=None):
+    """Generate one seeded city for iter_cities, compiled to a CityGraph if asked."""
+    city = (builder_class or CityBuilder)(seed=seed, **options).generate_random_city()
+    return CityGraph.from_city(city) if compiled else city
+
+def _generate_batch_city(options: Dict, seed: int, filename: Optional[str], collect_stats: bool = False,
+                         content_hash: bool = False, builder_class=None):
+    """Generate one seeded city inside a batch worker.
+
+    The builder is rebuilt from options as builder_class (CityBuilder by
+    default). Saves the city as JSON under filename, or packs it when
+    filename is None. Returns (filename or packed blob, stats dict or
+    None, city hash or None).
+    """
+    builder = (builder_class or CityBuilder)(seed=seed, **options)
+    stats = GenerationStats() if collect_stats else None
+    city = builder.generate_random_city(stats)
+    stats = stats.to_dict() if stats is not None else None
+    digest = city_hash(city) if content_hash else None
+    if filename is None:
+        return pack_city(city), stats, digest
+    builder.save_city(city, filename)
+    return filename, stats, digest
@@ -0,0 +1,131 @@
+import os
+from collections.abc import Sequence
+from typing import Dict, Optional
+
+import numpy as np
+
+from city_generator.packed_city import PackedCity, pack_city, unpack_city
+
+# A corpus is a directory of shard files holding concatenated packed city
+# blobs, plus index.bin: one int64 (shard, offset, length) row per city.
+INDEX_FILE = "index.bin"
+INDEX_COLUMNS = 3
+
+
+def _shard_name(shard: int) -> str:
+    return f"shard_{shard:05d}.bin"
+
+
+def corpus_length(path: str) -> int:
+    """Number of complete index rows in the corpus at path (0 if it has none)."""
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return 0
+    return os.path.getsize(index_path) // (INDEX_COLUMNS * np.dtype(np.int64).itemsize)
+
+
+class CityCorpusWriter:
+    """Append packed cities to a corpus, rolling over to a new shard at max_shard_bytes.
+
+    Reopening an existing corpus keeps appending after its last complete
+    city; a partial index row or blob left by a crash is cut off first.
+    With keep set, only the first `keep` cities are kept.
+    """
+
+    def __init__(self, path: str, max_shard_bytes: int = 1 << 30, keep: Optional[int] = None):
+        self.path = path
+        self.max_shard_bytes = max_shard_bytes
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, INDEX_FILE)
+        row_bytes = INDEX_COLUMNS * np.dtype(np.int64).itemsize
+        index = np.empty(0, dtype=np.int64)
+        if os.path.exists(index_path):
+            index = np.fromfile(index_path, dtype=np.int64)
+            index = index[:len(index) - len(index) % INDEX_COLUMNS]
+        index = index.reshape(-1, INDEX_COLUMNS)
+        if keep is not None:
+            index = index[:keep]
+        if os.path.exists(index_path):
+            os.truncate(index_path, len(index) * row_bytes)
+
+        self.count = len(index)
+        self.shard = int(index[-1, 0]) if self.count else 0
+        self._truncate_shards(int(index[-1, 1] + index[-1, 2]) if self.count else 0)
+        self._index = open(index_path, "ab")
+        self._open_shard()
+
+    def _truncate_shards(self, end: int):
+        """Cut the current shard at `end` and remove any shards after it."""
+        shard_path = os.path.join(self.path, _shard_name(self.shard))
+        if os.path.exists(shard_path):
+            os.truncate(shard_path, end)
+        later = self.shard + 1
+        while os.path.exists(os.path.join(self.path, _shard_name(later))):
+            os.remove(os.path.join(self.path, _shard_name(later)))
+            later += 1
+
+    def _open_shard(self):
+        shard_path = os.path.join(self.path, _shard_name(self.shard))
+        self._shard_file = open(shard_path, "ab")
+        self.shard_bytes = self._shard_file.tell()
+
+    def append(self, city: Dict) -> int:
+        """Append a city dict; returns its corpus index."""
+        return self.append_packed(pack_city(city))
+
+    def append_packed(self, blob: bytes) -> int:
+        """Append an already packed city blob; returns its corpus index."""
+        if self.shard_bytes and self.shard_bytes + len(blob) > self.max_shard_bytes:
+            self._shard_file.close()
+            self.shard += 1
+            self._open_shard()
+
+        offset = self.shard_bytes
+        self._shard_file.write(blob)
+        self.shard_bytes += len(blob)
+        self._index.write(np.array([self.shard, offset, len(blob)], dtype=np.int64).tobytes())
+        self.count += 1
+        return self.count - 1
+
+    def flush(self):
+        self._shard_file.flush()
+        self._index.flush()
+
+    def close(self):
+        self._shard_file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CityCorpus(Sequence):
+    """Random access to the cities of a corpus without scanning.
+
+    corpus[i] returns a PackedCity whose arrays are views into the
+    memory-mapped shard.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        index = np.fromfile(os.path.join(path, INDEX_FILE), dtype=np.int64)
+        self.index = index.reshape(-1, INDEX_COLUMNS)
+        self._shards = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _shard(self, shard: int) -> np.memmap:
+        if shard not in self._shards:
+            self._shards[shard] = np.memmap(os.path.join(self.path, _shard_name(shard)), dtype=np.uint8, mode="r")
+        return self._shards[shard]
+
+    def __getitem__(self, i) -> PackedCity:
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        shard, offset, _ = self.index[i].tolist()
+        return unpack_city(self._shard(shard), offset)
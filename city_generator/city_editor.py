@@ -0,0 +1,336 @@
+from collections import deque
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set
+
+from city_generator.disjoint_set import DisjointSet
+from city_generator.spatial import SpatialGrid
+from city_generator.station_ids import STATION_PREFIX, station_name, uses_integer_ids
+
+
+class CityEditor:
+    """Incremental edits on a generated city without regenerating it.
+
+    Stations, connections and route stops can be added and removed. Each
+    edit keeps the generator's invariants up to date, touching only the
+    neighbourhood it affects:
+    - co-located stations are transfers, with 2 minute transfer connections
+      between different modes
+    - different-mode stations within walking distance 2 are connected
+    - the network stays connected
+
+    The editor works on its own copy of the city; to_city() returns the
+    edited city dict.
+    """
+
+    WALK_RADIUS = 2
+
+    def __init__(self, city_data: Dict):
+        self._city = city_data
+        self.grid_size = city_data["grid_size"]
+        self.integer_ids = uses_integer_ids(city_data)
+
+        self.stations: Dict = {s["id"]: dict(s) for s in city_data["stations"]}
+        self.routes: Dict[str, Dict] = {r["id"]: dict(r, stations=list(r["stations"]))
+                                        for r in city_data.get("routes", [])}
+
+        # Connections by insertion key; adjacency maps station -> neighbour -> keys
+        self._connections: Dict[int, Dict] = {}
+        self._adjacency: Dict = {station_id: {} for station_id in self.stations}
+        self._keys = count()
+        for conn in city_data.get("connections", []):
+            self._link(dict(conn))
+
+        self._spatial_index = SpatialGrid(3)
+        self._locations: Dict = {}
+        for station_id, station in self.stations.items():
+            self._place(station_id, station)
+
+        self._station_routes: Dict = {station_id: set() for station_id in self.stations}
+        for route_id, route in self.routes.items():
+            for station_id in route["stations"]:
+                self._station_routes[station_id].add(route_id)
+
+        self._next_id = self._first_free_id()
+        self._next_route = self._first_free_route()
+
+    def _id_number(self, station_id) -> Optional[int]:
+        """Number of a generated-style station ID ("station_17" or 17), None for other IDs."""
+        if isinstance(station_id, int):
+            return station_id
+        if isinstance(station_id, str) and station_id.startswith(STATION_PREFIX) \
+                and station_id[len(STATION_PREFIX):].isdigit():
+            return int(station_id[len(STATION_PREFIX):])
+        return None
+
+    def _first_free_id(self) -> int:
+        numbers = [self._id_number(station_id) for station_id in self.stations]
+        return max((n for n in numbers if n is not None), default=-1) + 1
+
+    def _first_free_route(self) -> int:
+        numbers = [int(route_id.split("_")[1]) for route_id in self.routes
+                   if route_id.startswith("route_") and route_id.split("_")[1].isdigit()]
+        return max(numbers, default=-1) + 1
+
+    def _place(self, station_id, station: Dict):
+        self._spatial_index.insert(station["x"], station["y"], station_id)
+        self._locations.setdefault((station["x"], station["y"]), []).append(station_id)
+
+    def _link(self, conn: Dict) -> Dict:
+        key = next(self._keys)
+        self._connections[key] = conn
+        a, b = conn["from"], conn["to"]
+        self._adjacency[a].setdefault(b, []).append(key)
+        self._adjacency[b].setdefault(a, []).append(key)
+        return conn
+
+    def _require_station(self, station_id):
+        if station_id not in self.stations:
+            raise KeyError(f"Unknown station: {station_id}")
+
+    def _distance(self, a, b) -> int:
+        s1, s2 = self.stations[a], self.stations[b]
+        return abs(s1["x"] - s2["x"]) + abs(s1["y"] - s2["y"])
+
+    def neighbors(self, station_id) -> List:
+        return list(self._adjacency[station_id])
+
+    def has_connection(self, a, b) -> bool:
+        return b in self._adjacency.get(a, {})
+
+    # Stations
+
+    def add_station(self, x: int, y: int, station_type: str, station_id=None):
+        """Add a station and its transfer, walking and connectivity links; returns its ID."""
+        if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
+            raise ValueError(f"Position ({x}, {y}) is outside the {self.grid_size}x{self.grid_size} grid")
+        if station_id is None:
+            # Skip numbers taken since the counter was set
+            while True:
+                station_id = self._next_id if self.integer_ids else f"{STATION_PREFIX}{self._next_id}"
+                self._next_id += 1
+                if station_id not in self.stations:
+                    break
+        elif station_id in self.stations:
+            raise ValueError(f"Station {station_id} already exists")
+        else:
+            # Keep generated IDs past an explicit numbered one
+            number = self._id_number(station_id)
+            if number is not None:
+                self._next_id = max(self._next_id, number + 1)
+
+        # Nearest existing station, looked up before the new one is indexed
+        nearest = self._spatial_index.nearest(x, y)
+
+        station = {"id": station_id, "x": x, "y": y, "type": station_type, "is_transfer": False}
+        self.stations[station_id] = station
+        self._adjacency[station_id] = {}
+        self._station_routes[station_id] = set()
+        self._place(station_id, station)
+
+        # Co-located stations become transfers, with quick transfers between modes
+        group = self._locations[(x, y)]
+        if len(group) > 1:
+            for other in group:
+                self.stations[other]["is_transfer"] = True
+                if other != station_id and self.stations[other]["type"] != station_type:
+                    self.add_connection(station_id, other, 2)
+
+        # Walking connections to nearby stations of other modes
+        for other in self._spatial_index.within(x, y, self.WALK_RADIUS):
+            if (other != station_id and self.stations[other]["type"] != station_type
+                    and not self.has_connection(station_id, other)):
+                distance = self._distance(station_id, other)
+                self.add_connection(station_id, other, max(3, int(distance * 100 / 60)))
+
+        # A station with no links yet joins the network through its nearest station
+        if not self._adjacency[station_id] and nearest is not None:
+            dist, other = nearest
+            self.add_connection(station_id, other, dist * 120)  # 2 minutes per grid unit
+
+        return station_id
+
+    def remove_station(self, station_id):
+        """Remove a station, its connections and route stops, then reconnect what it split."""
+        self._require_station(station_id)
+        station = self.stations[station_id]
+        former_neighbors = list(self._adjacency[station_id])
+
+        for other in former_neighbors:
+            self._unlink(station_id, other)
+        for route_id in list(self._station_routes[station_id]):
+            self.remove_route_stop(route_id, station_id)
+
+        location = (station["x"], station["y"])
+        group = self._locations[location]
+        group.remove(station_id)
+        if len(group) == 1:
+            self.stations[group[0]]["is_transfer"] = False
+        elif not group:
+            del self._locations[location]
+        self._spatial_index.remove(station["x"], station["y"], station_id)
+
+        del self.stations[station_id]
+        del self._adjacency[station_id]
+        del self._station_routes[station_id]
+
+        self._reconnect(former_neighbors)
+
+    # Connections
+
+    def add_connection(self, a, b, walk_time: Optional[float] = None) -> Dict:
+        """Connect two stations; walk_time defaults to 2 minutes per grid unit."""
+        self._require_station(a)
+        self._require_station(b)
+        if a == b:
+            raise ValueError("A station cannot be connected to itself")
+        if self.has_connection(a, b):
+            raise ValueError(f"Stations {a} and {b} are already connected")
+        if walk_time is None:
+            walk_time = self._distance(a, b) * 120
+        return self._link({"from": a, "to": b, "walk_time": walk_time})
+
+    def _unlink(self, a, b):
+        for key in self._adjacency[a].pop(b):
+            del self._connections[key]
+        del self._adjacency[b][a]
+
+    def remove_connection(self, a, b):
+        """Remove the connection between a and b, bridging the network again if it split."""
+        self._require_station(a)
+        self._require_station(b)
+        if not self.has_connection(a, b):
+            raise KeyError(f"Stations {a} and {b} are not connected")
+        self._unlink(a, b)
+        self._reconnect([a, b])
+
+    def _reconnect(self, sources: Iterable):
+        """Reconnect the components that contain the given stations.
+
+        Before the edit the network was connected, so every component left
+        behind contains one of the sources. Breadth-first searches from all
+        sources run in lockstep, and searches that meet are merged. If all of
+        them merge, nothing was split and only the region between the sources
+        was visited. If a merged search runs out of stations first, it has
+        found the smallest cut-off component; that component is bridged to
+        its nearest outside station and the search starts again.
+        """
+        pending = list(dict.fromkeys(sources))
+        while len(pending) > 1:
+            component = self._closed_component(pending)
+            if component is None:
+                return
+            self._bridge(component)
+            pending = [source for source in pending if source not in component]
+
+    def _closed_component(self, sources: List) -> Optional[Set]:
+        """Run the lockstep searches; the first exhausted component, or None if all meet."""
+        labels = DisjointSet(len(sources))
+        owner = {source: k for k, source in enumerate(sources)}
+        queues = [deque([source]) for source in sources]
+        active = {k: 1 for k in range(len(sources))}  # group root -> searches with work left
+
+        while True:
+            for k, queue in enumerate(queues):
+                if not queue:
+                    continue
+                station_id = queue.popleft()
+                for other in self._adjacency[station_id]:
+                    if other not in owner:
+                        owner[other] = k
+                        queue.append(other)
+                        continue
+                    root_k, root_other = labels.find(k), labels.find(owner[other])
+                    if root_k != root_other:
+                        labels.union(root_k, root_other)
+                        merged = active.pop(root_k) + active.pop(root_other)
+                        active[labels.find(k)] = merged
+                        if labels.count == 1:
+                            return None
+                if not queue:
+                    root = labels.find(k)
+                    active[root] -= 1
+                    if active[root] == 0:
+                        return {station for station, label in owner.items() if labels.find(label) == root}
+
+    def _bridge(self, component: Set):
+        """Connect a component to the nearest station outside it."""
+        for station_id in component:
+            station = self.stations[station_id]
+            self._spatial_index.remove(station["x"], station["y"], station_id)
+        best = None
+        for station_id in component:
+            station = self.stations[station_id]
+            # Only a strictly closer pair can improve on the best one so far
+            max_dist = None if best is None else best[0] - 1
+            if max_dist is not None and max_dist < 0:
+                break
+            nearest = self._spatial_index.nearest(station["x"], station["y"], max_dist)
+            if nearest is not None:
+                best = (nearest[0], station_id, nearest[1])
+        for station_id in component:
+            station = self.stations[station_id]
+            self._spatial_index.insert(station["x"], station["y"], station_id)
+
+        if best is not None:
+            dist, a, b = best
+            self.add_connection(a, b, dist * 120)  # 2 minutes per grid unit
+
+    # Routes
+
+    def add_route_stop(self, route_id: str, station_id, position: Optional[int] = None):
+        """Add a stop to a route; without a position it goes where it adds the least distance."""
+        self._require_station(station_id)
+        route = self.routes[route_id]
+        if self.stations[station_id]["type"] != route["mode"]:
+            raise ValueError(f"Station {station_id} is not a {route['mode']} station")
+        if station_id in route["stations"]:
+            raise ValueError(f"Station {station_id} is already on {route_id}")
+
+        stops = route["stations"]
+        if position is None:
+            # Cheapest insertion: at either end or between two consecutive stops
+            best = (self._distance(station_id, stops[0]), 0)
+            best = min(best, (self._distance(station_id, stops[-1]), len(stops)))
+            for k in range(1, len(stops)):
+                detour = (self._distance(stops[k - 1], station_id) + self._distance(station_id, stops[k])
+                          - self._distance(stops[k - 1], stops[k]))
+                best = min(best, (detour, k))
+            position = best[1]
+        stops.insert(position, station_id)
+        self._station_routes[station_id].add(route_id)
+
+    def remove_route_stop(self, route_id: str, station_id):
+        """Remove a stop; routes left with fewer than two stops are dropped."""
+        route = self.routes[route_id]
+        route["stations"].remove(station_id)
+        self._station_routes[station_id].discard(route_id)
+        if len(route["stations"]) < 2:
+            for other in route["stations"]:
+                self._station_routes[other].discard(route_id)
+            del self.routes[route_id]
+
+    def add_route(self, mode: str, station_ids: List, color: Optional[str] = None) -> str:
+        """Add a route through the given stations in order; returns its ID."""
+        if len(station_ids) < 2:
+            raise ValueError("A route needs at least two stations")
+        for station_id in station_ids:
+            self._require_station(station_id)
+        route_id = f"route_{self._next_route}"
+        self._next_route += 1
+        self.routes[route_id] = {"id": route_id, "mode": mode, "stations": list(station_ids),
+                                 "color": color or "#000000"}
+        for station_id in station_ids:
+            self._station_routes[station_id].add(route_id)
+        return route_id
+
+    def to_city(self) -> Dict:
+        """The edited city as a city dict."""
+        city = dict(self._city)
+        city["stations"] = [dict(s) for s in self.stations.values()]
+        city["connections"] = [dict(c) for c in self._connections.values()]
+        city["routes"] = [dict(r, stations=list(r["stations"])) for r in self.routes.values()]
+        names = self._city.get("station_names")
+        if names:
+            # Interned names are looked up by the original integer ID
+            city["station_names"] = [names[s] if s < len(names) else station_name(s) for s in self.stations]
+        return city
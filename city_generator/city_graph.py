@@ -0,0 +1,159 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from city_generator.packed_city import STATION_TYPES, PackedCity
+
+
+def _csr(rows: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (indptr, order) grouping entries by row, stable within a row."""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, order
+
+
+def _dense_integer_ids(station_ids: List) -> bool:
+    return all(type(station_id) is int and station_id == i for i, station_id in enumerate(station_ids))
+
+
+class _IdentityIndex:
+    """Stand-in for the ID -> index dict when IDs are already indices."""
+
+    def __getitem__(self, station_id: int) -> int:
+        return station_id
+
+
+class CityGraph:
+    """Struct-of-arrays city compiled once from a city dict.
+
+    Stations are dense integer indices into the coordinate/type arrays.
+    Edges keep the order of city["connections"] (edge_from/edge_to/
+    edge_walk_time), and the undirected adjacency is stored as CSR
+    (indptr/indices/walk_time). Routes are CSR over station indices
+    (route_indptr/route_stations), with the reverse membership in
+    station_route_indptr/station_routes.
+    """
+
+    def __init__(self, grid_size: int, station_ids: List, x: np.ndarray, y: np.ndarray,
+                 station_type: np.ndarray, is_transfer: np.ndarray,
+                 edge_from: np.ndarray, edge_to: np.ndarray, edge_walk_time: np.ndarray,
+                 route_ids: List[str], route_mode: np.ndarray,
+                 route_indptr: np.ndarray, route_stations: np.ndarray):
+        self.grid_size = grid_size
+        self.station_ids = station_ids
+        # Dense integer IDs are their own index; only string IDs need a lookup dict
+        self.integer_ids = _dense_integer_ids(station_ids)
+        self.index = None if self.integer_ids else {station_id: i for i, station_id in enumerate(station_ids)}
+        self.x = x
+        self.y = y
+        self.station_type = station_type
+        self.is_transfer = is_transfer
+
+        self.edge_from = edge_from
+        self.edge_to = edge_to
+        self.edge_walk_time = edge_walk_time
+
+        n = len(station_ids)
+        sources = np.concatenate([edge_from, edge_to])
+        targets = np.concatenate([edge_to, edge_from])
+        self.indptr, order = _csr(sources, n)
+        self.indices = targets[order].astype(np.int32)
+        self.walk_time = np.concatenate([edge_walk_time, edge_walk_time])[order]
+
+        self.route_ids = route_ids
+        self.route_mode = route_mode
+        self.route_indptr = route_indptr
+        self.route_stations = route_stations
+
+        route_of_entry = np.repeat(np.arange(len(route_ids), dtype=np.int32), np.diff(route_indptr))
+        self.station_route_indptr, order = _csr(route_stations, n)
+        self.station_routes = route_of_entry[order]
+
+    @property
+    def num_stations(self) -> int:
+        return len(self.station_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_from)
+
+    @classmethod
+    def from_city(cls, city_data) -> "CityGraph":
+        """Compile a city dict (or a PackedCity, reusing its arrays)."""
+        if isinstance(city_data, PackedCity):
+            return cls._from_packed(city_data)
+
+        stations = city_data["stations"]
+        station_ids = [s["id"] for s in stations]
+        if _dense_integer_ids(station_ids):
+            index = _IdentityIndex()
+        else:
+            index = {station_id: i for i, station_id in enumerate(station_ids)}
+        type_codes = {station_type: code for code, station_type in enumerate(STATION_TYPES)}
+
+        connections = city_data.get("connections", [])
+        routes = city_data.get("routes", [])
+
+        return cls(
+            grid_size=city_data["grid_size"],
+            station_ids=station_ids,
+            x=np.array([s["x"] for s in stations], dtype=np.int32),
+            y=np.array([s["y"] for s in stations], dtype=np.int32),
+            station_type=np.array([type_codes[s["type"]] for s in stations], dtype=np.uint8),
+            is_transfer=np.array([s.get("is_transfer", False) for s in stations], dtype=bool),
+            edge_from=np.array([index[c["from"]] for c in connections], dtype=np.int32),
+            edge_to=np.array([index[c["to"]] for c in connections], dtype=np.int32),
+            edge_walk_time=np.array([c["walk_time"] for c in connections], dtype=np.float64),
+            route_ids=[r["id"] for r in routes],
+            route_mode=np.array([type_codes[r["mode"]] for r in routes], dtype=np.uint8),
+            route_indptr=np.concatenate([[0], np.cumsum([len(r["stations"]) for r in routes])]).astype(np.int64),
+            route_stations=np.array([index[s] for r in routes for s in r["stations"]], dtype=np.int32),
+        )
+
+    @classmethod
+    def _from_packed(cls, packed: PackedCity) -> "CityGraph":
+        a = packed.arrays
+        edge_from = np.repeat(np.arange(packed.num_stations, dtype=np.int32), np.diff(a["conn_indptr"]))
+        return cls(
+            grid_size=packed.grid_size,
+            station_ids=packed.station_ids(),
+            x=a["station_x"],
+            y=a["station_y"],
+            station_type=a["station_type"],
+            is_transfer=a["station_transfer"].astype(bool),
+            edge_from=edge_from,
+            edge_to=a["conn_to"],
+            edge_walk_time=a["conn_walk_time"].astype(np.float64),
+            route_ids=packed.header["route_ids"],
+            route_mode=a["route_mode"],
+            route_indptr=a["route_indptr"],
+            route_stations=a["route_stations"],
+        )
+
+    def station_index(self, station_id) -> int:
+        if self.integer_ids:
+            return station_id
+        return self.index[station_id]
+
+    def neighbors(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbour indices of station i and the walk times to them."""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.walk_time[start:end]
+
+    def route(self, r: int) -> np.ndarray:
+        """Station indices of route r in travel order."""
+        return self.route_stations[self.route_indptr[r]:self.route_indptr[r + 1]]
+
+    def station_route_indices(self, i: int) -> np.ndarray:
+        """Indices of the routes serving station i."""
+        return self.station_routes[self.station_route_indptr[i]:self.station_route_indptr[i + 1]]
+
+    def type_mask(self, station_type: str) -> np.ndarray:
+        return self.station_type == STATION_TYPES.index(station_type)
+
+    def edge_segments(self) -> np.ndarray:
+        """Edge endpoints as an (E, 2, 2) array of [[x1, y1], [x2, y2]]."""
+        start = np.stack([self.x[self.edge_from], self.y[self.edge_from]], axis=1)
+        end = np.stack([self.x[self.edge_to], self.y[self.edge_to]], axis=1)
+        return np.stack([start, end], axis=1)
@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+import numpy as np
+
+from city_generator.city_graph import CityGraph
+from city_generator.zone_raster import ZONE_TYPES, ZoneRaster
+
+# Bump when the canonical form changes so old cache keys stop matching
+HASH_VERSION = 1
+
+
+def _zone_codes(city_data) -> np.ndarray:
+    """Zone raster codes expressed in the default ZONE_TYPES table."""
+    zones = city_data["zones"]
+    if not isinstance(zones, ZoneRaster):
+        zones = ZoneRaster.from_dicts(zones, city_data["grid_size"])
+    table = [ZONE_TYPES.index(zone_type) if zone_type in ZONE_TYPES else len(ZONE_TYPES) + k
+             for k, zone_type in enumerate(zones.zone_types)]
+    return np.asarray(table, dtype=np.uint8)[zones.codes]
+
+
+def city_hash(city_data) -> str:
+    """Canonical SHA-256 content hash of a city.
+
+    Covers the grid size, zones, station positions/types/transfer flags,
+    connections and routes. It does not depend on dict key order, on
+    integer vs string station IDs, on the order of the connections or
+    their direction, on route IDs or colours, or on whether the city is
+    a dict, a raster-zone dict or a PackedCity. Station and route order
+    do count, since station indices and route order are how travel-time
+    matrices and schedules refer to them. Every cache derived from a city
+    (travel times, schedules, renders) should be keyed on this hash.
+    """
+    graph = CityGraph.from_city(city_data)
+    digest = hashlib.sha256()
+
+    def update(tag: str, data: bytes):
+        digest.update(f"{tag}:{len(data)}:".encode("ascii"))
+        digest.update(data)
+
+    update("version", str(HASH_VERSION).encode("ascii"))
+    update("grid_size", str(graph.grid_size).encode("ascii"))
+    update("zones", np.ascontiguousarray(_zone_codes(city_data)).tobytes())
+
+    update("stations", np.stack([
+        graph.x.astype("<i8"), graph.y.astype("<i8"),
+        graph.station_type.astype("<i8"), graph.is_transfer.astype("<i8")
+    ], axis=1).tobytes())
+
+    # Connections as undirected (low, high, walk_time) rows in sorted order
+    low = np.minimum(graph.edge_from, graph.edge_to).astype("<i8")
+    high = np.maximum(graph.edge_from, graph.edge_to).astype("<i8")
+    walk_time = graph.edge_walk_time.astype("<f8")
+    order = np.lexsort((walk_time, high, low))
+    update("connection_ends", np.stack([low[order], high[order]], axis=1).tobytes())
+    update("connection_walk_times", walk_time[order].tobytes())
+
+    routes = [[int(graph.route_mode[r])] + graph.route(r).tolist() for r in range(len(graph.route_ids))]
+    update("routes", json.dumps(routes, separators=(",", ":")).encode("ascii"))
+
+    return digest.hexdigest()
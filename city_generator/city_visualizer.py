@@ -3,11 +3,14 @@ import sys
 import json
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from city_generator.city_builder import CityBuilder
+from city_generator.city_graph import CityGraph
+from city_generator.station_ids import station_label
 
 def visualize_city(city_data, title="City Layout"):
     fig, ax = plt.subplots(figsize=(12, 12))
@@ -15,7 +18,6 @@ def visualize_city(city_data, title="City Layout"):
     grid_size = city_data["grid_size"]
     zones = city_data["zones"]
     stations = city_data["stations"]
-    connections = city_data["connections"]
     
     # Zone colors from existing city module
     zone_colors = {
@@ -38,16 +40,10 @@ def visualize_city(city_data, title="City Layout"):
                            facecolor=color, alpha=0.3, edgecolor="none")
         ax.add_patch(rect)
     
-    # Draw connections
-    for conn in connections:
-        s1 = next(s for s in stations if s["id"] == conn["from"])
-        s2 = next(s for s in stations if s["id"] == conn["to"])
-        
-        x1, y1 = s1["x"], s1["y"]
-        x2, y2 = s2["x"], s2["y"]
-        
-        ax.plot([x1, x2], [y1, y2], color="gray", linewidth=1, 
-               alpha=0.3, linestyle=":", zorder=1)
+    # Draw connections in one collection using the compiled graph
+    graph = CityGraph.from_city(city_data)
+    ax.add_collection(LineCollection(graph.edge_segments(), colors="gray", linewidths=1,
+                                     alpha=0.3, linestyles=":", zorder=1))
     
     # Draw stations
     for station in stations:
@@ -74,7 +70,7 @@ def visualize_city(city_data, title="City Layout"):
                   edgecolors="black", linewidth=1, zorder=5)
         
         # Add station labels
-        ax.annotate(station["id"].split("_")[1], (x, y), xytext=(5, 5), 
+        ax.annotate(station_label(station["id"]), (x, y), xytext=(5, 5), 
                    textcoords="offset points", fontsize=6, alpha=0.7)
     
     # Add legends
@@ -167,7 +163,7 @@ def main():
                     
                     # Load city
                     builder = CityBuilder()
-                    city = builder.load_city(filename)
+                    city = builder.load_city(filename, data_path)
                     print(f"Loaded {filename}")
                     
                     # Visualize
@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
 import json
 import os
 import sys
@@ -8,6 +9,8 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from city_generator.city_builder import CityBuilder
+from city_generator.city_graph import CityGraph
+from city_generator.station_ids import station_label
 
 def visualize_city(city_data, title="City Layout"):
     fig, ax = plt.subplots(figsize=(12, 12))
@@ -15,7 +18,6 @@ def visualize_city(city_data, title="City Layout"):
     grid_size = city_data["grid_size"]
     zones = city_data["zones"]
     stations = city_data["stations"]
-    connections = city_data.get("connections", [])
     routes = city_data.get("routes", [])
     
     # Zone colors from existing city module
@@ -40,26 +42,19 @@ def visualize_city(city_data, title="City Layout"):
                            facecolor=color, alpha=0.3, edgecolor="none")
         ax.add_patch(rect)
     
+    # Compile once so edges and routes index coordinate arrays directly
+    graph = CityGraph.from_city(city_data)
+    
     # Draw walking connections first (light gray dots)
-    for conn in connections:
-        s1 = next(s for s in stations if s["id"] == conn["from"])
-        s2 = next(s for s in stations if s["id"] == conn["to"])
-        
-        x1, y1 = s1["x"], s1["y"]
-        x2, y2 = s2["x"], s2["y"]
-        
-        ax.plot([x1, x2], [y1, y2], color="gray", linewidth=1, 
-               alpha=0.3, linestyle=":", zorder=1)
+    ax.add_collection(LineCollection(graph.edge_segments(), colors="gray", linewidths=1,
+                                     alpha=0.3, linestyles=":", zorder=1))
     
     # Draw colored route lines
-    for route in routes:
-        route_stations = []
-        for station_id in route["stations"]:
-            station = next(s for s in stations if s["id"] == station_id)
-            route_stations.append((station["x"], station["y"]))
+    for r, route in enumerate(routes):
+        route_stations = graph.route(r)
         
         if len(route_stations) >= 2:
-            xs, ys = zip(*route_stations)
+            xs, ys = graph.x[route_stations], graph.y[route_stations]
             color = route.get("color", mode_colors.get(route["mode"], "#000000"))
             
             # Different line styles for different modes
@@ -112,7 +107,7 @@ def visualize_city(city_data, title="City Layout"):
                       edgecolors="black", linewidth=1, zorder=5)
         
         # Add station labels
-        ax.annotate(station["id"].split("_")[1], (x, y), xytext=(5, 5), 
+        ax.annotate(station_label(station["id"]), (x, y), xytext=(5, 5), 
                    textcoords="offset points", fontsize=8, alpha=0.8,
                    fontweight="bold")
     
@@ -193,8 +188,7 @@ def main():
                 try:
                     idx = int(input("Select file: ")) - 1
                     if 0 <= idx < len(files):
-                        with open(f"{data_dir}/{files[idx]}", "r") as f:
-                            city = json.load(f)
+                        city = CityBuilder().load_city(files[idx], data_dir)
                         visualize_city(city, f"City: {files[idx]}")
                     else:
                         print("Invalid selection")
@@ -0,0 +1,34 @@
+from typing import List
+
+
+class DisjointSet:
+    """Union-find over station indices with path halving and union by size."""
+
+    def __init__(self, size: int):
+        self.parent: List[int] = list(range(size))
+        self.size: List[int] = [1] * size
+        self.count = size  # number of components
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the components of a and b; returns False if already joined."""
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return False
+
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.count -= 1
+        return True
+
+    def connected(self, a: int, b: int) -> bool:
+        return self.find(a) == self.find(b)
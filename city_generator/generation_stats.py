@@ -0,0 +1,83 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional, Union
+
+
+class GenerationStats:
+    """Side-channel counters for the phases of city generation.
+
+    For every phase it sums wall time, the net change in allocated memory
+    blocks (sys.getallocatedblocks) and the size of the phase output, plus
+    peak traced memory when tracemalloc is running. Passing the same object
+    to many generate_random_city calls, or to generate_batch_cities,
+    aggregates them.
+    """
+
+    def __init__(self):
+        self.cities = 0
+        self.phases: Dict[str, Dict] = {}
+
+    def _record(self, name: str) -> Dict:
+        if name not in self.phases:
+            self.phases[name] = {
+                "calls": 0,
+                "seconds": 0.0,
+                "allocated_blocks": 0,
+                "peak_traced_bytes": 0,
+                "output_size": 0
+            }
+        return self.phases[name]
+
+    @contextmanager
+    def phase(self, name: str):
+        record = self._record(name)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+            record["allocated_blocks"] += sys.getallocatedblocks() - blocks
+            record["calls"] += 1
+            if tracing:
+                record["peak_traced_bytes"] = max(record["peak_traced_bytes"], tracemalloc.get_traced_memory()[1])
+
+    def add_output(self, name: str, size: int):
+        self._record(name)["output_size"] += size
+
+    def merge(self, other: Union["GenerationStats", Dict]):
+        """Add the counters of another stats object (or its to_dict form)."""
+        if isinstance(other, GenerationStats):
+            other = other.to_dict()
+        self.cities += other["cities"]
+        for name, values in other["phases"].items():
+            record = self._record(name)
+            for key, value in values.items():
+                if key == "peak_traced_bytes":
+                    record[key] = max(record[key], value)
+                else:
+                    record[key] += value
+
+    def to_dict(self) -> Dict:
+        return {"cities": self.cities, "phases": {name: dict(values) for name, values in self.phases.items()}}
+
+    def report(self) -> str:
+        """Human-readable table of the phases, slowest first."""
+        lines = [f"{'phase':<24}{'seconds':>10}{'share':>8}{'blocks':>12}{'output':>12}"]
+        top_level = sum(v["seconds"] for name, v in self.phases.items() if "." not in name) or 1.0
+        for name, values in sorted(self.phases.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{name:<24}{values['seconds']:>10.3f}{values['seconds'] / top_level:>8.1%}"
+                f"{values['allocated_blocks']:>12}{values['output_size']:>12}"
+            )
+        return "\n".join(lines)
+
+
+def stats_phase(stats: Optional[GenerationStats], name: str):
+    """stats.phase(name), or a no-op context when stats are not collected."""
+    return stats.phase(name) if stats is not None else nullcontext()
@@ -0,0 +1,243 @@
+import json
+import struct
+from collections.abc import Mapping
+from typing import BinaryIO, Dict, List, Tuple
+
+import numpy as np
+
+from city_generator.atomic_file import atomic_open
+from city_generator.zone_raster import ZONE_TYPES, ZoneRaster
+
+# Packed city layout: MAGIC, u32 format version, u32 header length, a JSON
+# header, then the data section with every array aligned to ALIGNMENT bytes.
+# Array offsets in the header are relative to the data section, so blobs
+# can be concatenated into corpus shards and opened at any offset.
+MAGIC = b"RAAHICTY"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sII")
+
+STATION_TYPES = ("bus", "tram", "metro")
+
+
+def _canonical_station_ids(station_ids: List) -> bool:
+    """True if IDs are "station_<index>" (or the index itself) and need not be stored."""
+    return all(station_id == i or station_id == f"station_{i}" for i, station_id in enumerate(station_ids))
+
+
+def _city_arrays(city: Dict) -> Tuple[Dict, Dict]:
+    """Compile a city dict into the arrays and header fields of the packed format."""
+    stations = city["stations"]
+    station_ids = [s["id"] for s in stations]
+    index = {station_id: i for i, station_id in enumerate(station_ids)}
+    type_codes = {station_type: code for code, station_type in enumerate(STATION_TYPES)}
+
+    arrays = {
+        "station_x": np.array([s["x"] for s in stations], dtype=np.int32),
+        "station_y": np.array([s["y"] for s in stations], dtype=np.int32),
+        "station_type": np.array([type_codes[s["type"]] for s in stations], dtype=np.uint8),
+        "station_transfer": np.array([s.get("is_transfer", False) for s in stations], dtype=np.uint8),
+    }
+
+    # Connections as CSR keyed by the "from" station, keeping list order per row
+    connections = city.get("connections", [])
+    conn_from = np.array([index[c["from"]] for c in connections], dtype=np.int64)
+    conn_to = np.array([index[c["to"]] for c in connections], dtype=np.int32)
+    walk_time = np.asarray([c["walk_time"] for c in connections])
+    walk_time = walk_time.astype(np.int32 if walk_time.dtype.kind in "iu" else np.float32)
+    order = np.argsort(conn_from, kind="stable")
+    arrays["conn_indptr"] = np.concatenate(
+        [[0], np.cumsum(np.bincount(conn_from, minlength=len(stations)))]
+    ).astype(np.int64)
+    arrays["conn_to"] = conn_to[order]
+    arrays["conn_walk_time"] = walk_time[order]
+
+    routes = city.get("routes", [])
+    mode_codes = {mode: code for code, mode in enumerate(STATION_TYPES)}
+    route_lengths = [len(r["stations"]) for r in routes]
+    arrays["route_indptr"] = np.concatenate([[0], np.cumsum(route_lengths, dtype=np.int64)]).astype(np.int64)
+    arrays["route_stations"] = np.array(
+        [index[station_id] for r in routes for station_id in r["stations"]], dtype=np.int32
+    )
+    arrays["route_mode"] = np.array([mode_codes[r["mode"]] for r in routes], dtype=np.uint8)
+
+    zones = ZoneRaster.from_dicts(city.get("zones", []), city["grid_size"])
+    arrays["zones"] = np.ascontiguousarray(zones.codes, dtype=np.uint8)
+
+    header = {
+        "grid_size": city["grid_size"],
+        "station_ids": None if _canonical_station_ids(station_ids) else station_ids,
+        "integer_ids": bool(station_ids) and isinstance(station_ids[0], int),
+        "zone_types": list(zones.zone_types),
+        "route_ids": [r["id"] for r in routes],
+        "route_colors": [r.get("color") for r in routes],
+    }
+    return arrays, header
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def pack_city(city: Dict) -> bytes:
+    """Serialize a city dict into a self-contained packed blob."""
+    arrays, header = _city_arrays(city)
+
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _align(offset + arr.nbytes)
+    header["arrays"] = layout
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    data_start = _align(PREAMBLE.size + len(header_bytes))
+    blob = bytearray(data_start + offset)
+    PREAMBLE.pack_into(blob, 0, MAGIC, FORMAT_VERSION, len(header_bytes))
+    blob[PREAMBLE.size:PREAMBLE.size + len(header_bytes)] = header_bytes
+    for name, arr in arrays.items():
+        start = data_start + layout[name]["offset"]
+        blob[start:start + arr.nbytes] = arr.tobytes()
+    return bytes(blob)
+
+
+def write_packed_city(f: BinaryIO, city: Dict) -> int:
+    """Append a packed city to an open binary file; returns bytes written."""
+    blob = pack_city(city)
+    f.write(blob)
+    return len(blob)
+
+
+def save_packed_city(city: Dict, path: str):
+    with atomic_open(path, "wb") as f:
+        write_packed_city(f, city)
+
+
+def unpack_city(buffer: np.ndarray, offset: int = 0) -> "PackedCity":
+    """Open the packed city starting at `offset` of a uint8 buffer without copying."""
+    magic, version, header_size = PREAMBLE.unpack(bytes(buffer[offset:offset + PREAMBLE.size]))
+    if magic != MAGIC:
+        raise ValueError("Not a packed city: bad magic bytes")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed city version: {version}")
+
+    header_start = offset + PREAMBLE.size
+    header = json.loads(bytes(buffer[header_start:header_start + header_size]).decode("utf-8"))
+    data_start = offset + _align(PREAMBLE.size + header_size)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+    return PackedCity(header, arrays)
+
+
+def load_packed_city(path: str, mmap: bool = True) -> "PackedCity":
+    """Open a packed city file, memory-mapped read-only by default."""
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+    return unpack_city(buffer)
+
+
+class PackedCity(Mapping):
+    """Read-only city backed by packed arrays.
+
+    The arrays are exposed directly for array consumers; the legacy dict
+    keys (grid_size, zones, stations, connections, routes) are built lazily
+    on first access and cached. Connections come back grouped by their
+    "from" station.
+    """
+
+    KEYS = ("grid_size", "zones", "stations", "connections", "routes")
+
+    def __init__(self, header: Dict, arrays: Dict):
+        self.header = header
+        self.arrays = arrays
+        self._cache = {}
+
+    @property
+    def grid_size(self) -> int:
+        return self.header["grid_size"]
+
+    @property
+    def num_stations(self) -> int:
+        return len(self.arrays["station_x"])
+
+    def station_ids(self) -> List:
+        ids = self.header.get("station_ids")
+        if ids is None:
+            if self.header.get("integer_ids"):
+                return list(range(self.num_stations))
+            ids = [f"station_{i}" for i in range(self.num_stations)]
+        return ids
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key == "grid_size":
+            return self.grid_size
+        if key not in self._cache:
+            self._cache[key] = getattr(self, f"_build_{key}")()
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def _build_zones(self) -> ZoneRaster:
+        return ZoneRaster(self.arrays["zones"], self.header.get("zone_types", ZONE_TYPES))
+
+    def _build_stations(self) -> List[Dict]:
+        a = self.arrays
+        return [
+            {"id": station_id, "x": x, "y": y, "type": STATION_TYPES[code], "is_transfer": bool(transfer)}
+            for station_id, x, y, code, transfer in zip(
+                self.station_ids(), a["station_x"].tolist(), a["station_y"].tolist(),
+                a["station_type"].tolist(), a["station_transfer"].tolist()
+            )
+        ]
+
+    def _build_connections(self) -> List[Dict]:
+        a = self.arrays
+        ids = self.station_ids()
+        counts = np.diff(a["conn_indptr"])
+        conn_from = np.repeat(np.arange(self.num_stations), counts)
+        return [
+            {"from": ids[i], "to": ids[j], "walk_time": walk_time}
+            for i, j, walk_time in zip(conn_from.tolist(), a["conn_to"].tolist(),
+                                       a["conn_walk_time"].tolist())
+        ]
+
+    def _build_routes(self) -> List[Dict]:
+        a = self.arrays
+        ids = self.station_ids()
+        indptr = a["route_indptr"].tolist()
+        members = a["route_stations"].tolist()
+        return [
+            {
+                "id": route_id,
+                "mode": STATION_TYPES[mode],
+                "stations": [ids[i] for i in members[indptr[r]:indptr[r + 1]]],
+                "color": color
+            }
+            for r, (route_id, mode, color) in enumerate(zip(
+                self.header["route_ids"], a["route_mode"].tolist(), self.header["route_colors"]
+            ))
+        ]
+
+    def to_dict(self, raster_zones: bool = False) -> Dict:
+        """Materialize a plain city dict (legacy zone dicts unless raster_zones)."""
+        zones = self["zones"]
+        return {
+            "grid_size": self.grid_size,
+            "zones": zones if raster_zones else zones.to_dicts(),
+            "stations": self["stations"],
+            "connections": self["connections"],
+            "routes": self["routes"]
+        }
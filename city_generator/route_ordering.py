@@ -0,0 +1,67 @@
+import math
+from typing import List, Sequence
+
+from city_generator.spatial import SpatialGrid
+
+
+def nearest_neighbor_order(xs: Sequence[int], ys: Sequence[int], start: int) -> List[int]:
+    """Greedy nearest-neighbour path over points, starting at index `start`.
+
+    Unvisited points live in a SpatialGrid sized for about two points per
+    cell, so each step is a local ring search instead of a scan of every
+    remaining point. Ties go to the lowest index, as with min() over the
+    points in order.
+    """
+    n = len(xs)
+    if n == 0:
+        return []
+
+    span = max(max(xs) - min(xs), max(ys) - min(ys)) + 1
+    cell_size = max(1, int(span / math.sqrt(max(1, n / 2))))
+    index = SpatialGrid(cell_size)
+    for i in range(n):
+        if i != start:
+            index.insert(xs[i], ys[i], i)
+
+    order = [start]
+    current = start
+    for _ in range(n - 1):
+        _, nearest = index.nearest(xs[current], ys[current])
+        index.remove(xs[nearest], ys[nearest], nearest)
+        order.append(nearest)
+        current = nearest
+    return order
+
+
+def two_opt(xs: Sequence[int], ys: Sequence[int], order: List[int],
+            max_passes: int = 2, window: int = 50) -> List[int]:
+    """Shorten an open path with 2-opt segment reversals (Manhattan lengths).
+
+    Each pass only tries reversals spanning at most `window` stops, and at
+    most `max_passes` passes run, so the cost stays O(passes * n * window).
+    """
+    order = list(order)
+    n = len(order)
+
+    def dist(a, b):
+        return abs(xs[a] - xs[b]) + abs(ys[a] - ys[b])
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            for j in range(i + 1, min(n, i + window + 1)):
+                c = order[j]
+                # Reversing order[i..j] swaps edges (a, b), (c, d) for (a, c), (b, d)
+                if j + 1 < n:
+                    d = order[j + 1]
+                    delta = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+                else:
+                    delta = dist(a, c) - dist(a, b)
+                if delta < 0:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    b = order[i]
+                    improved = True
+        if not improved:
+            break
+    return order
@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class DistanceRaster:
+    """Occupancy bitmap holding the Manhattan distance to the nearest point.
+
+    Minimum-distance checks become a single array read, and inserting a point
+    only rewrites the diamond of cells it can block. Distances are exact up
+    to the current minimum distance, which may only shrink over time.
+    """
+
+    def __init__(self, grid_size: int, min_dist: int):
+        self.grid_size = grid_size
+        # Cells with no point yet are free for any minimum distance
+        self.dist = np.full((grid_size, grid_size), np.iinfo(np.int32).max, dtype=np.int32)
+        # Points inserted while every cell was already blocked
+        self._pending = []
+        self.set_min_distance(min_dist)
+
+    def set_min_distance(self, min_dist: int):
+        self.min_dist = min_dist
+        self.radius = max(-1, min_dist - 1)
+        offsets = np.abs(np.arange(-self.radius, self.radius + 1, dtype=np.int32))
+        self._diamond = offsets[:, None] + offsets[None, :]
+        self.free_cells = int(np.count_nonzero(self.dist >= min_dist))
+
+        pending, self._pending = self._pending, []
+        for x, y in pending:
+            self.insert(x, y)
+
+    def is_too_close(self, x: int, y: int) -> bool:
+        return self.dist[x, y] < self.min_dist
+
+    def insert(self, x: int, y: int):
+        r = self.radius
+        if r < 0:
+            return
+        if self.free_cells == 0:
+            # Nothing left to block; only a smaller distance needs this point
+            self._pending.append((x, y))
+            return
+
+        x0, x1 = max(0, x - r), min(self.grid_size, x + r + 1)
+        y0, y1 = max(0, y - r), min(self.grid_size, y + r + 1)
+        window = self.dist[x0:x1, y0:y1]
+        diamond = self._diamond[x0 - x + r:x1 - x + r, y0 - y + r:y1 - y + r]
+
+        free_before = np.count_nonzero(window >= self.min_dist)
+        np.minimum(window, diamond, out=window)
+        self.free_cells -= free_before - int(np.count_nonzero(window >= self.min_dist))
+
+
+class SpatialGrid:
+    """Bucket grid points into square cells for local Manhattan queries."""
+
+    def __init__(self, cell_size: int):
+        self.cell_size = max(1, cell_size)
+        self.buckets = defaultdict(list)
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def insert(self, x: int, y: int, item: Any = None):
+        self.buckets[self._cell(x, y)].append((x, y, item))
+
+    def within(self, x: int, y: int, max_dist: int) -> Iterator[Any]:
+        """Yield items whose point lies within Manhattan distance max_dist."""
+        cx, cy = self._cell(x, y)
+        reach = max_dist // self.cell_size + 1
+        buckets = self.buckets
+        for bx in range(cx - reach, cx + reach + 1):
+            for by in range(cy - reach, cy + reach + 1):
+                for px, py, item in buckets.get((bx, by), ()):
+                    if abs(x - px) + abs(y - py) <= max_dist:
+                        yield item
+
+    def remove(self, x: int, y: int, item: Any = None):
+        cell = self._cell(x, y)
+        bucket = self.buckets[cell]
+        bucket.remove((x, y, item))
+        if not bucket:
+            del self.buckets[cell]
+
+    def _ring(self, cx: int, cy: int, ring: int) -> Iterator[Tuple[int, int]]:
+        """Cells at Chebyshev cell distance `ring` from (cx, cy)."""
+        for bx in range(cx - ring, cx + ring + 1):
+            if bx == cx - ring or bx == cx + ring:
+                for by in range(cy - ring, cy + ring + 1):
+                    yield bx, by
+            else:
+                yield bx, cy - ring
+                yield bx, cy + ring
+
+    def nearest(self, x: int, y: int, max_dist: Optional[int] = None) -> Optional[Tuple[int, Any]]:
+        """Return (dist, item) of the nearest point, ties broken by smallest item.
+
+        Rings of cells are searched outward until no closer point can exist;
+        once a ring would hold more cells than there are non-empty buckets,
+        the remaining buckets are scanned directly instead. With max_dist,
+        points further away are ignored and the search stops at that radius.
+        """
+        buckets = self.buckets
+        best = None
+        cx, cy = self._cell(x, y)
+        ring = 0
+        while buckets:
+            scan_all = (2 * ring + 1) ** 2 >= len(buckets)
+            cells = list(buckets) if scan_all else self._ring(cx, cy, ring)
+            for cell in cells:
+                for px, py, item in buckets.get(cell, ()):
+                    candidate = (abs(x - px) + abs(y - py), item)
+                    if (best is None or candidate < best) and (max_dist is None or candidate[0] <= max_dist):
+                        best = candidate
+            if scan_all:
+                break
+            # Points beyond this ring are at least ring * cell_size + 1 away
+            reach = ring * self.cell_size
+            if (best is not None and best[0] <= reach) or (max_dist is not None and max_dist <= reach):
+                break
+            ring += 1
+        return best
+
+
+def manhattan_mst_candidates(xs: Sequence[int], ys: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """Return candidate edges (dist, i, j) that contain a Manhattan MST.
+
+    For every point only the nearest neighbour in each of the eight octants
+    around it can be part of a minimum spanning tree, so a sweep over the
+    points sorted by x + y yields at most 4n candidate edges in O(n log n).
+    Any cut of the points is crossed by a minimum-weight candidate edge,
+    which also makes these edges enough to bridge disconnected components.
+    """
+    n = len(xs)
+    px = list(xs)
+    py = list(ys)
+    order = list(range(n))
+    edges = []
+
+    for k in range(4):
+        order.sort(key=lambda i: px[i] + py[i])
+
+        # Active points keyed by -y, kept sorted; each holds the point still
+        # waiting for its nearest neighbour in the current octant
+        keys = []
+        values = []
+        for i in order:
+            pos = bisect_left(keys, -py[i])
+            while pos < len(keys):
+                j = values[pos]
+                dx = px[i] - px[j]
+                dy = py[i] - py[j]
+                if dy > dx:
+                    break
+                edges.append((dx + dy, i, j))
+                del keys[pos]
+                del values[pos]
+
+            if pos < len(keys) and keys[pos] == -py[i]:
+                values[pos] = i
+            else:
+                keys.insert(pos, -py[i])
+                values.insert(pos, i)
+
+        # Rotate/reflect the plane so the next pass covers another octant pair
+        if k & 1:
+            px = [-x for x in px]
+        else:
+            px, py = py, px
+
+    return edges
+
+
+def colocated_transfers(xs: np.ndarray, ys: np.ndarray, types: np.ndarray
+                        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find co-located stations and the different-mode pairs among them.
+
+    Returns (is_transfer, pair_i, pair_j): a mask of the stations sharing
+    their position with another station, and every pair i < j at the same
+    position with different types. Pairs are ordered by the first station
+    of their location, then by i and j, which matches a scan over stations
+    grouping them by location in order of first appearance.
+    """
+    n = len(xs)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return np.zeros(0, dtype=bool), empty, empty
+
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    types = np.asarray(types)
+    key = (xs - xs.min()) * (int(ys.max() - ys.min()) + 1) + (ys - ys.min())
+    _, first, group, counts = np.unique(key, return_index=True, return_inverse=True, return_counts=True)
+    group = group.ravel()
+    is_transfer = counts[group] > 1
+
+    # Stations of shared locations sorted by location, then by index
+    shared = np.flatnonzero(is_transfer)
+    members = shared[np.argsort(group[shared], kind="stable")]
+    member_group = group[members]
+
+    pair_i, pair_j = [], []
+    for offset in range(1, int(counts.max())):
+        i, j = members[:-offset], members[offset:]
+        same = (member_group[:-offset] == member_group[offset:]) & (types[i] != types[j])
+        pair_i.append(i[same])
+        pair_j.append(j[same])
+    pair_i = np.concatenate(pair_i) if pair_i else np.empty(0, dtype=np.int64)
+    pair_j = np.concatenate(pair_j) if pair_j else np.empty(0, dtype=np.int64)
+
+    # Locations in order of their first station
+    order = np.lexsort((pair_j, pair_i, first[group[pair_i]]))
+    return is_transfer, pair_i[order], pair_j[order]
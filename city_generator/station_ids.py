@@ -0,0 +1,64 @@
+from typing import Dict, List
+
+# Cities may carry dense integer station IDs (station i has id i) internally.
+# String IDs ("station_17") only exist at the JSON boundary.
+STATION_PREFIX = "station_"
+
+
+def uses_integer_ids(city: Dict) -> bool:
+    stations = city["stations"]
+    return bool(stations) and isinstance(stations[0]["id"], int)
+
+
+def station_name(station_id) -> str:
+    """External string ID for a station ID of either form."""
+    if isinstance(station_id, int):
+        return f"{STATION_PREFIX}{station_id}"
+    return station_id
+
+
+def station_label(station_id) -> str:
+    """Short label for plots: the number of "station_17", or the integer itself."""
+    if isinstance(station_id, int):
+        return str(station_id)
+    return station_id.split("_")[1]
+
+
+def _remap_city(city: Dict, ids: List) -> Dict:
+    mapping = {s["id"]: new_id for s, new_id in zip(city["stations"], ids)}
+    remapped = dict(city)
+    remapped["stations"] = [dict(s, id=new_id) for s, new_id in zip(city["stations"], ids)]
+    remapped["connections"] = [
+        dict(c, **{"from": mapping[c["from"]], "to": mapping[c["to"]]}) for c in city.get("connections", [])
+    ]
+    remapped["routes"] = [
+        dict(r, stations=[mapping[s] for s in r["stations"]]) for r in city.get("routes", [])
+    ]
+    return remapped
+
+
+def intern_station_ids(city: Dict) -> Dict:
+    """Return a copy of the city whose station IDs are dense ints in station order.
+
+    Names other than "station_<index>" are kept in city["station_names"] so
+    externalize_station_ids can restore them.
+    """
+    if uses_integer_ids(city):
+        return city
+
+    names = [s["id"] for s in city["stations"]]
+    interned = _remap_city(city, list(range(len(names))))
+    if any(name != f"{STATION_PREFIX}{i}" for i, name in enumerate(names)):
+        interned["station_names"] = names
+    return interned
+
+
+def externalize_station_ids(city: Dict) -> Dict:
+    """Return a copy of the city with string station IDs, for JSON output."""
+    if not uses_integer_ids(city):
+        return city
+
+    names = city.get("station_names") or [station_name(s["id"]) for s in city["stations"]]
+    external = _remap_city(city, names)
+    external.pop("station_names", None)
+    return external
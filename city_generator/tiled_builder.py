@@ -0,0 +1,288 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from city_generator.city_builder import CityBuilder, _generate_batch_city, city_seed
+from city_generator.generation_stats import GenerationStats, stats_phase
+from city_generator.packed_city import STATION_TYPES, PackedCity, unpack_city
+from city_generator.spatial import SpatialGrid, manhattan_mst_candidates
+from city_generator.zone_raster import ZoneRaster
+
+
+class TiledCityBuilder(CityBuilder):
+    """Generate very large cities as a grid of independently generated tiles.
+
+    Every tile_size x tile_size tile is a regular seeded CityBuilder city
+    (zones, stations, local connections and routes) built in a worker
+    process. The tiles are then stitched: coordinates and station IDs are
+    offset, walking connections are added across tile borders (plus the
+    closest cross-border pair wherever no walking link exists, which keeps
+    the city connected), and metro trunk routes run along every row and
+    column of tiles. Only the stitching runs over the whole city, and it
+    only looks at stations near tile borders.
+    """
+
+    def __init__(self, grid_size: int = 1000, tile_size: int = 250, workers: Optional[int] = None,
+                 placement: str = "random", raster_zones: bool = False, seed: Optional[int] = None,
+                 integer_ids: bool = False, route_two_opt: int = 0):
+        if tile_size <= 0 or grid_size % tile_size != 0:
+            raise ValueError(f"grid_size {grid_size} is not a multiple of tile_size {tile_size}")
+        super().__init__(grid_size=grid_size, placement=placement, raster_zones=raster_zones, seed=seed,
+                         integer_ids=integer_ids, route_two_opt=route_two_opt)
+        self.tile_size = tile_size
+        self.tiles_per_side = grid_size // tile_size
+        # None uses every core; 1 generates the tiles in this process
+        self.workers = workers
+
+    def _builder_options(self) -> Dict:
+        """Constructor arguments needed to rebuild this tiled builder in a batch or stream worker."""
+        options = super()._builder_options()
+        options["tile_size"] = self.tile_size
+        options["workers"] = self.workers
+        return options
+
+    def _worker_options(self) -> Dict:
+        """Rebuild options for a pool worker: its tiles are generated in that process.
+
+        The batch or stream pool already spreads cities over the cores, so
+        a tile pool per worker would only oversubscribe them.
+        """
+        options = self._builder_options()
+        options["workers"] = 1
+        return options
+
+    def _tile_options(self) -> Dict:
+        """Builder options of a single tile; tiles always use raster zones and integer IDs."""
+        return {
+            "grid_size": self.tile_size,
+            "placement": self.placement,
+            "raster_zones": True,
+            "integer_ids": True,
+            "route_two_opt": self.route_two_opt
+        }
+
+    def _generate_tiles(self, stats: Optional[GenerationStats]) -> List[PackedCity]:
+        """Generate every tile, in (tx, ty) order, as a packed city."""
+        tile_count = self.tiles_per_side ** 2
+        city_seed_value = self.rng.getrandbits(64)
+        seeds = [city_seed(city_seed_value, k) for k in range(tile_count)]
+        options = self._tile_options()
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        workers = min(workers, tile_count)
+
+        collect_stats = stats is not None
+        if workers <= 1:
+            results = [_generate_batch_city(options, seed, None, collect_stats) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_generate_batch_city, [options] * tile_count, seeds,
+                                            [None] * tile_count, [collect_stats] * tile_count))
+
+        tiles = []
+        for blob, tile_stats, _ in results:
+            if tile_stats is not None:
+                # Tiles are parts of one city, not cities of their own
+                tile_stats["cities"] = 0
+                stats.merge(tile_stats)
+            tiles.append(unpack_city(np.frombuffer(blob, dtype=np.uint8)))
+        return tiles
+
+    def generate_random_city(self, stats: Optional[GenerationStats] = None) -> Dict:
+        """Generate the tiles in parallel and stitch them into one city."""
+        with stats_phase(stats, "tiles"):
+            tiles = self._generate_tiles(stats)
+        with stats_phase(stats, "tiles.stitch"):
+            city = self._stitch_tiles(tiles)
+
+        if stats is not None:
+            stats.cities += 1
+            stats.add_output("tiles", len(tiles))
+            stats.add_output("tiles.stitch", len(city["connections"]))
+        return city
+
+    def _tile_origin(self, k: int) -> Tuple[int, int]:
+        tx, ty = divmod(k, self.tiles_per_side)
+        return tx * self.tile_size, ty * self.tile_size
+
+    def _stitch_tiles(self, tiles: List[PackedCity]) -> Dict:
+        n = self.tiles_per_side
+        codes = np.empty((self.grid_size, self.grid_size), dtype=np.uint8)
+        xs, ys, types, transfers = [], [], [], []
+        conn_from, conn_to, conn_walk = [], [], []
+        routes = []
+        starts = [0]
+
+        for k, tile in enumerate(tiles):
+            a = tile.arrays
+            x0, y0 = self._tile_origin(k)
+            base = starts[-1]
+            codes[x0:x0 + self.tile_size, y0:y0 + self.tile_size] = a["zones"]
+
+            xs.append(a["station_x"] + x0)
+            ys.append(a["station_y"] + y0)
+            types.append(a["station_type"])
+            transfers.append(a["station_transfer"].astype(bool))
+
+            conn_from.append(np.repeat(np.arange(tile.num_stations), np.diff(a["conn_indptr"])) + base)
+            conn_to.append(a["conn_to"].astype(np.int64) + base)
+            conn_walk.append(a["conn_walk_time"].astype(np.int64))
+
+            indptr = a["route_indptr"].tolist()
+            members = (a["route_stations"].astype(np.int64) + base).tolist()
+            for r, (mode, color) in enumerate(zip(a["route_mode"].tolist(), tile.header["route_colors"])):
+                routes.append((STATION_TYPES[mode], members[indptr[r]:indptr[r + 1]], color))
+
+            starts.append(base + tile.num_stations)
+
+        xs = np.concatenate(xs)
+        ys = np.concatenate(ys)
+        types = np.concatenate(types)
+        is_transfer = np.concatenate(transfers)
+
+        # Connections across every pair of neighbouring tiles, including diagonal ones
+        border = []
+        for tx in range(n):
+            for ty in range(n):
+                k = tx * n + ty
+                if tx + 1 < n:
+                    border.extend(self._border_connections(xs, ys, types, starts, k, k + n, axis=0))
+                if ty + 1 < n:
+                    border.extend(self._border_connections(xs, ys, types, starts, k, k + 1, axis=1))
+                if tx + 1 < n and ty + 1 < n:
+                    border.extend(self._corner_connections(xs, ys, types, starts, k, k + n + 1))
+                if tx + 1 < n and ty > 0:
+                    border.extend(self._corner_connections(xs, ys, types, starts, k, k + n - 1))
+
+        # One metro trunk per row and per column of tiles, through each tile's most central metro station
+        hubs = [self._tile_hub(xs, ys, types, starts, k) for k in range(len(tiles))]
+        trunks = []
+        for line in range(n):
+            for members in ([hubs[tx * n + line] for tx in range(n)], [hubs[line * n + ty] for ty in range(n)]):
+                members = [i for i in members if i is not None]
+                if len(members) >= 2:
+                    trunks.append(members)
+
+        def station_id(i):
+            return i if self.integer_ids else f"station_{i}"
+
+        stations = [
+            {"id": station_id(i), "x": x, "y": y, "type": STATION_TYPES[code], "is_transfer": transfer}
+            for i, (x, y, code, transfer) in enumerate(zip(xs.tolist(), ys.tolist(), types.tolist(),
+                                                           is_transfer.tolist()))
+        ]
+        connections = [
+            {"from": station_id(i), "to": station_id(j), "walk_time": walk_time}
+            for i, j, walk_time in zip(np.concatenate(conn_from).tolist(), np.concatenate(conn_to).tolist(),
+                                       np.concatenate(conn_walk).tolist())
+        ]
+        connections.extend({"from": station_id(i), "to": station_id(j), "walk_time": walk_time}
+                           for i, j, walk_time in border)
+
+        route_list = [
+            {"id": f"route_{r}", "mode": mode, "stations": [station_id(i) for i in members], "color": color}
+            for r, (mode, members, color) in enumerate(routes)
+        ]
+        for t, members in enumerate(trunks):
+            route_list.append({
+                "id": f"route_{len(route_list)}",
+                "mode": "metro",
+                "stations": [station_id(i) for i in members],
+                "color": self._get_route_color("metro", t)
+            })
+
+        zones = ZoneRaster(codes, self.zone_types)
+        return {
+            "grid_size": self.grid_size,
+            "zones": zones if self.raster_zones else zones.to_dicts(),
+            "stations": stations,
+            "connections": connections,
+            "routes": route_list
+        }
+
+    def _border_connections(self, xs: np.ndarray, ys: np.ndarray, types: np.ndarray, starts: List[int],
+                            a: int, b: int, axis: int) -> List[Tuple[int, int, int]]:
+        """Connections (i, j, walk_time) between tile a and the next tile b along axis.
+
+        Different-mode stations within walking distance 2 across the border
+        get walking connections, like inside a tile. If there are none, the
+        closest cross-border pair is connected instead so the tiles stay
+        connected to each other.
+        """
+        coord = xs if axis == 0 else ys
+        line = self._tile_origin(b)[axis]
+        a_range = np.arange(starts[a], starts[a + 1])
+        b_range = np.arange(starts[b], starts[b + 1])
+        if len(a_range) == 0 or len(b_range) == 0:
+            return []
+
+        # Only stations within 2 cells of the border can walk across it
+        a_near = a_range[coord[a_range] >= line - 2].tolist()
+        b_near = b_range[coord[b_range] < line + 2].tolist()
+        connections = self._walking_connections(xs, ys, types, a_near, b_near)
+        if connections:
+            return connections
+
+        # Closest pair: a pair at distance d means no station deeper than d from the line can beat it
+        band = 4
+        while True:
+            a_band = a_range[coord[a_range] >= line - band]
+            b_band = b_range[coord[b_range] < line + band]
+            members = np.concatenate([a_band, b_band])
+            best = None
+            for dist, i, j in manhattan_mst_candidates(xs[members].tolist(), ys[members].tolist()):
+                if (i < len(a_band)) != (j < len(a_band)):
+                    candidate = (dist, int(members[min(i, j)]), int(members[max(i, j)]))
+                    if best is None or candidate < best:
+                        best = candidate
+            if best is not None and (best[0] <= band or band >= self.tile_size):
+                dist, i, j = best
+                return [(i, j, dist * 120)]  # 2 minutes per grid unit
+            band *= 2
+
+    def _corner_connections(self, xs: np.ndarray, ys: np.ndarray, types: np.ndarray, starts: List[int],
+                            a: int, b: int) -> List[Tuple[int, int, int]]:
+        """Walking connections between tile a and the tile b touching it only at a corner.
+
+        The edge-adjacent tiles already keep the city connected, so no
+        closest pair is added here.
+        """
+        (ax, ay), (bx, by) = self._tile_origin(a), self._tile_origin(b)
+        corner_x, corner_y = bx, max(ay, by)
+
+        def near_corner(k):
+            members = np.arange(starts[k], starts[k + 1])
+            close = (np.abs(xs[members] - corner_x + 0.5) < 2) & (np.abs(ys[members] - corner_y + 0.5) < 2)
+            return members[close].tolist()
+
+        return self._walking_connections(xs, ys, types, near_corner(a), near_corner(b))
+
+    @staticmethod
+    def _walking_connections(xs: np.ndarray, ys: np.ndarray, types: np.ndarray, a_near: List[int],
+                             b_near: List[int]) -> List[Tuple[int, int, int]]:
+        """Walking connections between different-mode stations of a_near and b_near within distance 2."""
+        nearby_index = SpatialGrid(3)
+        for j in b_near:
+            nearby_index.insert(int(xs[j]), int(ys[j]), j)
+
+        connections = []
+        for i in a_near:
+            xi, yi = int(xs[i]), int(ys[i])
+            for j in sorted(nearby_index.within(xi, yi, 2)):
+                if types[i] != types[j]:
+                    distance = abs(xi - int(xs[j])) + abs(yi - int(ys[j]))
+                    connections.append((i, j, max(3, int(distance * 100 / 60))))
+        return connections
+
+    def _tile_hub(self, xs: np.ndarray, ys: np.ndarray, types: np.ndarray, starts: List[int],
+                  k: int) -> Optional[int]:
+        """The metro station of tile k closest to the tile centre, if any."""
+        members = np.arange(starts[k], starts[k + 1])
+        members = members[types[members] == STATION_TYPES.index("metro")]
+        if len(members) == 0:
+            return None
+        x0, y0 = self._tile_origin(k)
+        centre = self.tile_size // 2
+        distance = np.abs(xs[members] - (x0 + centre)) + np.abs(ys[members] - (y0 + centre))
+        return int(members[np.argmin(distance)])
@@ -0,0 +1,150 @@
+import heapq
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from city_generator.atomic_file import atomic_open
+from city_generator.city_graph import CityGraph, _csr
+from city_generator.city_hash import city_hash as content_hash
+from city_generator.packed_city import STATION_TYPES
+
+# In-vehicle minutes per grid unit of Manhattan distance between consecutive stops
+MODE_MINUTES_PER_CELL = {"metro": 0.5, "tram": 1.0, "bus": 1.5}
+
+# Up to this many stations auto uses Floyd-Warshall. The measured crossover
+# with per-source Dijkstra is about 1300-1600 stations; the cutoff stays
+# below it because Floyd-Warshall is memory-bound and slows most on
+# machines with less memory bandwidth.
+FLOYD_WARSHALL_MAX_STATIONS = 1024
+
+# Floyd-Warshall relaxes this many rows at a time, so each block stays in cache
+FLOYD_WARSHALL_ROW_BLOCK = 64
+
+# uint16 matrices hold whole minutes; this value marks unreachable pairs
+UNREACHABLE_UINT16 = np.iinfo(np.uint16).max
+
+
+def travel_time_edges(graph: CityGraph, mode_minutes: Optional[Dict[str, float]] = None
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Directed (source, target, minutes) edges: walking connections plus route segments.
+
+    Both kinds of edge run in both directions. A route segment between
+    consecutive stops costs their Manhattan distance times the mode's
+    minutes per grid unit.
+    """
+    mode_minutes = mode_minutes or MODE_MINUTES_PER_CELL
+    speeds = np.array([mode_minutes[mode] for mode in STATION_TYPES], dtype=np.float64)
+
+    # Consecutive stops of the same route
+    stops = graph.route_stations
+    same_route = np.ones(max(len(stops) - 1, 0), dtype=bool)
+    same_route[graph.route_indptr[1:-1] - 1] = False
+    seg_from, seg_to = stops[:-1][same_route], stops[1:][same_route]
+    route_of_stop = np.repeat(np.arange(len(graph.route_ids)), np.diff(graph.route_indptr))
+    seg_mode = graph.route_mode[route_of_stop[:-1][same_route]]
+    seg_minutes = (np.abs(graph.x[seg_from] - graph.x[seg_to]) + np.abs(graph.y[seg_from] - graph.y[seg_to])
+                   ) * speeds[seg_mode]
+
+    source = np.concatenate([graph.edge_from, graph.edge_to, seg_from, seg_to]).astype(np.int64)
+    target = np.concatenate([graph.edge_to, graph.edge_from, seg_to, seg_from]).astype(np.int64)
+    minutes = np.concatenate([graph.edge_walk_time, graph.edge_walk_time, seg_minutes, seg_minutes])
+    return source, target, minutes
+
+
+def _floyd_warshall(n: int, source: np.ndarray, target: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    times = np.full((n, n), np.inf)
+    np.fill_diagonal(times, 0.0)
+    np.minimum.at(times, (source, target), minutes)
+    rows = FLOYD_WARSHALL_ROW_BLOCK
+    scratch = np.empty((rows, n))
+    for k in range(n):
+        through_k = times[k]
+        # Relax pairs through k in place, one cache-sized block of rows at a time.
+        # Row k itself cannot improve through k, so updating it mid-pass is safe.
+        for start in range(0, n, rows):
+            block = times[start:start + rows]
+            candidate = scratch[:len(block)]
+            np.add(block[:, k, None], through_k, out=candidate)
+            np.minimum(block, candidate, out=block)
+    return times
+
+
+def _dijkstra_all_pairs(n: int, source: np.ndarray, target: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    indptr, order = _csr(source, n)
+    indptr = indptr.tolist()
+    targets = target[order].tolist()
+    weights = minutes[order].tolist()
+
+    times = np.full((n, n), np.inf)
+    for s in range(n):
+        dist = {s: 0.0}
+        heap = [(0.0, s)]
+        done = set()
+        while heap:
+            d, i = heapq.heappop(heap)
+            if i in done:
+                continue
+            done.add(i)
+            for k in range(indptr[i], indptr[i + 1]):
+                j = targets[k]
+                nd = d + weights[k]
+                if nd < dist.get(j, np.inf):
+                    dist[j] = nd
+                    heapq.heappush(heap, (nd, j))
+        times[s, list(dist)] = list(dist.values())
+    return times
+
+
+def compute_travel_times(city_data, dtype=np.float32, method: str = "auto",
+                         mode_minutes: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """All-pairs shortest travel times in minutes, indexed by station position.
+
+    method is "floyd_warshall", "dijkstra" or "auto" (Floyd-Warshall up to
+    FLOYD_WARSHALL_MAX_STATIONS stations). float32 matrices mark unreachable
+    pairs with inf; uint16 ones hold rounded minutes and UNREACHABLE_UINT16.
+    """
+    graph = city_data if isinstance(city_data, CityGraph) else CityGraph.from_city(city_data)
+    n = graph.num_stations
+    source, target, minutes = travel_time_edges(graph, mode_minutes)
+
+    if method == "auto":
+        method = "floyd_warshall" if n <= FLOYD_WARSHALL_MAX_STATIONS else "dijkstra"
+    if method == "floyd_warshall":
+        times = _floyd_warshall(n, source, target, minutes)
+    elif method == "dijkstra":
+        times = _dijkstra_all_pairs(n, source, target, minutes)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    if np.dtype(dtype) == np.uint16:
+        reachable = np.isfinite(times)
+        compact = np.full(times.shape, UNREACHABLE_UINT16, dtype=np.uint16)
+        compact[reachable] = np.minimum(np.rint(times[reachable]), UNREACHABLE_UINT16 - 1)
+        return compact
+    return times.astype(dtype)
+
+
+def save_travel_times(path: str, times: np.ndarray, city_hash: str):
+    with atomic_open(path, "wb") as f:
+        np.savez(f, times=times, city_hash=np.array(city_hash))
+
+
+def load_travel_times(path: str, city_hash: str) -> Optional[np.ndarray]:
+    """The cached matrix at path, or None if it is missing or was built for another city."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as cached:
+        if str(cached["city_hash"]) != city_hash:
+            return None
+        return cached["times"]
+
+
+def cached_travel_times(city_data, path: str, dtype=np.float32, method: str = "auto") -> np.ndarray:
+    """Load the travel-time matrix cached at path, recomputing it if the city changed."""
+    city_hash = content_hash(city_data)
+    times = load_travel_times(path, city_hash)
+    if times is None or times.dtype != np.dtype(dtype):
+        times = compute_travel_times(city_data, dtype=dtype, method=method)
+        save_travel_times(path, times, city_hash)
+    return times
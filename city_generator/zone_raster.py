@@ -0,0 +1,80 @@
+from collections.abc import Sequence
+from typing import Dict, List
+
+import numpy as np
+
+ZONE_TYPES = ("residential", "commercial", "industrial")
+
+
+class ZoneRaster(Sequence):
+    """Zone grid stored as uint8 codes indexing into zone_types.
+
+    Behaves like the legacy list of {"x", "y", "type"} dicts (x-major order),
+    building each dict only when it is accessed.
+    """
+
+    def __init__(self, codes: np.ndarray, zone_types=ZONE_TYPES):
+        self.codes = codes
+        self.zone_types = tuple(zone_types)
+
+    @property
+    def grid_size(self) -> int:
+        return self.codes.shape[0]
+
+    def __len__(self) -> int:
+        return self.codes.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("zone index out of range")
+        x, y = divmod(index, self.codes.shape[1])
+        return {"x": x, "y": y, "type": self.zone_types[self.codes[x, y]]}
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def zone_type(self, x: int, y: int) -> str:
+        return self.zone_types[self.codes[x, y]]
+
+    def to_dicts(self) -> List[Dict]:
+        """Materialize the legacy list of zone dicts."""
+        xs, ys = np.indices(self.codes.shape)
+        names = np.asarray(self.zone_types, dtype=object)[self.codes]
+        return [
+            {"x": x, "y": y, "type": zone_type}
+            for x, y, zone_type in zip(xs.ravel().tolist(), ys.ravel().tolist(), names.ravel().tolist())
+        ]
+
+    def to_json(self) -> Dict:
+        """Compact JSON form: one string of single-digit codes per x row."""
+        digits = (self.codes + ord("0")).astype(np.uint8)
+        return {
+            "zone_types": list(self.zone_types),
+            "rows": [row.tobytes().decode("ascii") for row in digits]
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ZoneRaster":
+        rows = [np.frombuffer(row.encode("ascii"), dtype=np.uint8) for row in data["rows"]]
+        codes = (np.stack(rows) - ord("0")).astype(np.uint8)
+        return cls(codes, data["zone_types"])
+
+    @classmethod
+    def from_dicts(cls, zones: List[Dict], grid_size: int, zone_types=ZONE_TYPES) -> "ZoneRaster":
+        if isinstance(zones, ZoneRaster):
+            return zones
+        zone_types = list(zone_types)
+        lookup = {zone_type: code for code, zone_type in enumerate(zone_types)}
+        codes = np.zeros((grid_size, grid_size), dtype=np.uint8)
+        for zone in zones:
+            code = lookup.get(zone["type"])
+            if code is None:
+                # Keep zone types outside the default table (e.g. hand-edited cities)
+                code = lookup[zone["type"]] = len(zone_types)
+                zone_types.append(zone["type"])
+            codes[zone["x"], zone["y"]] = code
+        return cls(codes, zone_types)
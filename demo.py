@@ -39,6 +39,7 @@ def demo_rl_training():
     trainer.save_model(model, "demo_model.pt")
     schedule = trainer.generate_schedule(model)
     trainer.save_schedule(schedule, "demo_schedule.json")
+    trainer.close()
     
     print("Model trained and saved to models/demo_model.pt")
     print("Schedule generated and saved to data/demo_schedule.json")
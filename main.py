@@ -43,6 +43,7 @@ def main():
             trainer = RLTrainer(city_data=city_data)
             model = trainer.train(episodes=100)
             trainer.save_model(model, "demo_model.pt")
+            trainer.close()
             print("Model saved to models/demo_model.pt")
             
         elif choice == "3":
@@ -0,0 +1,143 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from typing import Any, List, Optional, Sequence
+
+from rl_scheduler.env_tensors import EnvTensors
+
+EPISODE_STEPS = 288  # 24 hours in 5-min intervals
+
+
+class BatchedTransitEnv(VecEnv):
+    """N TransitEnv episodes stepped together as 2-D NumPy arrays.
+
+    Each episode runs on its own city (the same city dict may be passed
+    for every slot). Cities with fewer stations are padded up to the
+    largest one: padded action columns are ignored and padded loads stay
+    zero. A station mask keeps them out of the wait-time and
+    missed-connection terms. Rewards match TransitEnv for every episode up
+    to float rounding: actions are reduced in float64 over padded rows,
+    while TransitEnv reduces float32 actions in float32. A batch of
+    identical cities gives TransitEnv's observations.
+
+    All episodes have the same length, so they finish and auto-reset
+    together. Following the VecEnv convention, the last observation of a
+    finished episode is returned in infos[i]["terminal_observation"].
+
+    get_attr, set_attr and env_method act per episode on the attributes
+    in EPISODE_ATTRS. Per episode, env_method supports reset and render
+    (episodes have nothing to render, so it gives None).
+    """
+
+    # Attributes holding one entry per episode along their first axis
+    EPISODE_ATTRS = ("cities", "tensors", "num_stations", "station_mask", "transfers",
+                     "time_step", "passenger_loads")
+    # Per-episode state that set_attr may overwrite
+    EPISODE_STATE = ("time_step", "passenger_loads")
+
+    def __init__(self, cities: Sequence[dict], n_envs: Optional[int] = None):
+        if not isinstance(cities, (list, tuple)):
+            cities = [cities] * (n_envs or 1)
+        self.cities = list(cities)
+        num_envs = len(self.cities)
+        # Cities (dicts or EnvTensors) repeated across slots are compiled once
+        compiled = {}
+        for city in self.cities:
+            if id(city) not in compiled:
+                compiled[id(city)] = EnvTensors.from_city(city)
+        self.tensors = [compiled[id(city)] for city in self.cities]
+
+        self.num_stations = np.array([t.num_stations for t in self.tensors], dtype=np.int64)
+        max_stations = int(self.num_stations.max())
+        self.station_mask = np.arange(max_stations)[None, :] < self.num_stations[:, None]
+        # Static per-city terms, compiled once
+        self.transfers = np.array([t.transfer_count for t in self.tensors], dtype=np.float64)
+
+        action_space = spaces.Box(low=1, high=60, shape=(max_stations,), dtype=np.float32)
+        observation_space = spaces.Box(low=0, high=1000, shape=(max_stations + 1,), dtype=np.float32)
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.time_step = np.zeros(num_envs, dtype=np.int64)
+        self.passenger_loads = np.zeros((num_envs, max_stations))
+        self._actions = None
+
+    def reset(self) -> np.ndarray:
+        self.time_step[:] = 0
+        self.passenger_loads[:] = 0
+        return self._get_observation()
+
+    def step_async(self, actions: np.ndarray):
+        self._actions = np.asarray(actions, dtype=np.float64).reshape(self.num_envs, -1)
+
+    def step_wait(self):
+        frequencies = self._actions
+        mask = self.station_mask
+
+        # Reward terms of TransitEnv.step for the whole batch at once
+        wait_time = np.sum(np.where(mask, 60 / (frequencies + 1), 0.0), axis=1)
+        mean_frequency = np.sum(np.where(mask, frequencies, 0.0), axis=1) / self.num_stations
+        missed = np.maximum(0, 10 - mean_frequency)
+        reached = np.sum(self.passenger_loads * 0.1, axis=1)
+        rewards = -wait_time - 2 * missed - 0.5 * self.transfers + 3 * reached
+
+        self.time_step += 1
+        dones = self.time_step >= EPISODE_STEPS
+        obs = self._get_observation()
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+            self.time_step[dones] = 0
+            self.passenger_loads[dones] = 0
+            obs = self._get_observation()
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def _get_observation(self) -> np.ndarray:
+        obs = np.empty((self.num_envs, self.passenger_loads.shape[1] + 1), dtype=np.float32)
+        obs[:, :-1] = self.passenger_loads
+        obs[:, -1] = self.time_step / EPISODE_STEPS  # normalized time
+        return obs
+
+    def close(self):
+        pass
+
+    def _indices(self, indices) -> List[int]:
+        if indices is None:
+            return list(range(self.num_envs))
+        if isinstance(indices, int):
+            return [indices]
+        return list(indices)
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self, attr_name)
+        if attr_name in self.EPISODE_ATTRS:
+            return [value[i] for i in self._indices(indices)]
+        return [value for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None):
+        if attr_name in self.EPISODE_STATE:
+            for i in self._indices(indices):
+                getattr(self, attr_name)[i] = value
+        elif attr_name in self.EPISODE_ATTRS:
+            raise AttributeError(f"{attr_name} is compiled per city and cannot be set per episode")
+        elif indices is None or sorted(self._indices(indices)) == list(range(self.num_envs)):
+            setattr(self, attr_name, value)
+        else:
+            raise AttributeError(f"{attr_name} is shared by all episodes and cannot be set per episode")
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        episodes = self._indices(indices)
+        if method_name == "render":
+            return [None for _ in episodes]
+        if method_name != "reset":
+            raise AttributeError(f"BatchedTransitEnv episodes have no method {method_name}")
+        self.time_step[episodes] = 0
+        self.passenger_loads[episodes] = 0
+        obs = self._get_observation()
+        # Same return value as TransitEnv.reset
+        return [(obs[i], {}) for i in episodes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._indices(indices)]
@@ -0,0 +1,60 @@
+import numpy as np
+from typing import Dict, Optional
+
+from city_generator.city_graph import CityGraph
+from city_generator.packed_city import STATION_TYPES
+
+# Connections with a longer walk than this count as transfers
+TRANSFER_WALK_MINUTES = 5
+
+
+class EnvTensors:
+    """Static arrays a transit env needs, compiled once from a city.
+
+    None of these change during an episode, so env steps only do
+    arithmetic on them and never scan the city dicts. The arrays can be
+    views into shared memory (see rl_scheduler.shared_city).
+    """
+
+    ARRAYS = (
+        "station_x", "station_y", "station_type", "is_transfer",
+        "type_masks",  # one boolean row per STATION_TYPES entry
+        "walk_time",  # walk time of every connection, in city["connections"] order
+        "indptr", "indices", "neighbor_walk_time"  # undirected CSR adjacency
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray], transfer_count: Optional[int] = None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.num_stations = len(self.station_type)
+        self.num_edges = len(self.walk_time)
+        if transfer_count is None:
+            transfer_count = int(np.count_nonzero(self.walk_time > TRANSFER_WALK_MINUTES))
+        self.transfer_count = transfer_count
+
+    @classmethod
+    def from_graph(cls, graph: CityGraph) -> "EnvTensors":
+        return cls({
+            "station_x": graph.x,
+            "station_y": graph.y,
+            "station_type": graph.station_type,
+            "is_transfer": graph.is_transfer,
+            "type_masks": np.stack([graph.station_type == code for code in range(len(STATION_TYPES))]),
+            "walk_time": graph.edge_walk_time.astype(np.float32),
+            "indptr": graph.indptr,
+            "indices": graph.indices,
+            "neighbor_walk_time": graph.walk_time.astype(np.float32),
+        })
+
+    @classmethod
+    def from_city(cls, city_data) -> "EnvTensors":
+        if isinstance(city_data, EnvTensors):
+            return city_data
+        graph = city_data if isinstance(city_data, CityGraph) else CityGraph.from_city(city_data)
+        return cls.from_graph(graph)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def type_mask(self, station_type: str) -> np.ndarray:
+        return self.type_masks[STATION_TYPES.index(station_type)]
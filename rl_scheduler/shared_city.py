@@ -0,0 +1,97 @@
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict
+
+from rl_scheduler.env_tensors import EnvTensors
+
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without making this process responsible for unlinking it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Older versions register every attach with the resource tracker, which
+    # would unlink the segment when the first worker exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedCityHandle:
+    """Picklable reference to a published city: a segment name and array layout.
+
+    Its size does not depend on the city, so passing it to a worker costs
+    the same for any number of stations.
+    """
+
+    def __init__(self, name: str, layout: Dict, transfer_count: int):
+        self.name = name
+        self.layout = layout
+        self.transfer_count = transfer_count
+
+    def attach(self) -> EnvTensors:
+        """Read-only EnvTensors whose arrays are views into the shared segment."""
+        segment = _attach_segment(self.name)
+        arrays = {}
+        for array_name, (dtype, shape, offset) in self.layout.items():
+            arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf, offset=offset)
+            arr.flags.writeable = False
+            arrays[array_name] = arr
+        tensors = EnvTensors(arrays, transfer_count=self.transfer_count)
+        # The arrays are only valid while the segment stays mapped
+        tensors.shared_segment = segment
+        return tensors
+
+
+class SharedCity:
+    """Publish a city's compiled env arrays once in shared memory.
+
+    The owning process compiles the city into EnvTensors and copies the
+    arrays into a single segment. Env workers receive only the handle and
+    attach to the segment read-only, so worker startup does no parsing or
+    compiling, and the city is held in memory once however many workers
+    there are. The owner must close() (or use a with block) to unlink the
+    segment.
+    """
+
+    def __init__(self, city_data):
+        tensors = EnvTensors.from_city(city_data)
+        arrays = {name: np.ascontiguousarray(arr) for name, arr in tensors.arrays().items()}
+
+        layout = {}
+        offset = 0
+        for name, arr in arrays.items():
+            layout[name] = (arr.dtype.str, arr.shape, offset)
+            offset = _align(offset + arr.nbytes)
+
+        self._segment = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, arr in arrays.items():
+            _, shape, start = layout[name]
+            np.ndarray(shape, dtype=arr.dtype, buffer=self._segment.buf, offset=start)[...] = arr
+        self.handle = SharedCityHandle(self._segment.name, layout, tensors.transfer_count)
+
+    @property
+    def nbytes(self) -> int:
+        return self._segment.size
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,26 +2,59 @@ import torch
 import numpy as np
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from stable_baselines3.common.callbacks import BaseCallback
 import gymnasium as gym
 from gymnasium import spaces
 import json
+import math
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rl_scheduler.batched_env import BatchedTransitEnv
+from rl_scheduler.env_tensors import EnvTensors
+from rl_scheduler.shared_city import SharedCity, SharedCityHandle
+
+PPO_BATCH_SIZE = 64  # PPO's default minibatch size
 
 class TransitEnv(gym.Env):
-    def __init__(self, city_data: dict):
+    """Transit scheduling env over one city.
+
+    Buffer reuse contract: reset() and step() return the same float32
+    observation array every time, overwritten in place by the next call.
+    Callers that keep an observation across steps must copy it. The one
+    exception is the last step of an episode, which returns a copy:
+    DummyVecEnv keeps that observation by reference as
+    infos["terminal_observation"] and then calls reset(). The info dict is
+    fresh on every call.
+    """
+    
+    def __init__(self, city_data):
+        """city_data is a city dict, precompiled EnvTensors or a SharedCityHandle.
+
+        Envs built from tensors or a shared handle have no city dicts
+        (stations and connections are None).
+        """
         super().__init__()
         self.city_data = city_data
-        self.stations = city_data["stations"]
-        self.connections = city_data["connections"]
+        is_dict = not isinstance(city_data, (EnvTensors, SharedCityHandle))
+        self.stations = city_data["stations"] if is_dict else None
+        self.connections = city_data["connections"] if is_dict else None
+        # Static city arrays compiled once; steps only do arithmetic on them
+        if isinstance(city_data, SharedCityHandle):
+            self.tensors = city_data.attach()
+        else:
+            self.tensors = EnvTensors.from_city(city_data)
+        num_stations = self.tensors.num_stations
         
         # Action: schedule frequency for each station type
         self.action_space = spaces.Box(
-            low=1, high=60, shape=(len(self.stations),), dtype=np.float32
+            low=1, high=60, shape=(num_stations,), dtype=np.float32
         )
         
-        # Calculate observation space size
-        num_stations = len(self.stations)
-        
         # Simplified observation space for prototype
         # Just station loads and time
         obs_size = num_stations + 1
@@ -30,12 +63,18 @@ class TransitEnv(gym.Env):
             low=0, high=1000, shape=(obs_size,), dtype=np.float32
         )
         
+        # Preallocated state and scratch buffers; steps only write into them
+        self.passenger_loads = np.zeros(num_stations)
+        self._obs = np.zeros(obs_size, dtype=np.float32)
+        self._load_scratch = np.zeros(num_stations)
+        self._frequency_scratch = {}  # action dtype -> buffer
+        
         self.reset()
     
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.time_step = 0
-        self.passenger_loads = np.zeros(len(self.stations))
+        self.passenger_loads.fill(0)
         self.missed_connections = 0
         self.total_wait_time = 0
         self.passengers_reached = 0
@@ -62,28 +101,40 @@ class TransitEnv(gym.Env):
         self.time_step += 1
         done = self.time_step >= 288  # 24 hours in 5-min intervals
         
+        obs = self._get_observation()
+        if done:
+            # Kept past the auto-reset as the terminal observation
+            obs = obs.copy()
+        
         # Using gymnasium API format (obs, reward, terminated, truncated, info)
-        return self._get_observation(), reward, done, False, {}
+        return obs, reward, done, False, {}
     
     def _get_observation(self):
-        # Simplified state representation for prototype
-        obs = np.concatenate([
-            self.passenger_loads,
-            np.array([self.time_step / 288])  # normalized time
-        ])
-        return obs.astype(np.float32)
+        # Simplified state representation for prototype: loads, then normalized time
+        obs = self._obs
+        obs[:-1] = self.passenger_loads
+        obs[-1] = self.time_step / 288
+        return obs
     
     def _calculate_wait_times(self, frequencies):
-        # Simple wait time calculation
-        return np.sum(60 / (frequencies + 1))
+        # Simple wait time calculation, 60 / (frequencies + 1) summed in a scratch buffer
+        frequencies = np.asarray(frequencies)
+        dtype = frequencies.dtype if frequencies.dtype.kind == "f" else np.dtype(np.float64)
+        scratch = self._frequency_scratch.get(dtype)
+        if scratch is None or scratch.shape != frequencies.shape:
+            scratch = self._frequency_scratch[dtype] = np.empty(frequencies.shape, dtype)
+        np.add(frequencies, 1, out=scratch)
+        np.divide(60, scratch, out=scratch)
+        return scratch.sum()
     
     def _calculate_transfers(self):
-        # Count required transfers
-        return len([c for c in self.connections if c["walk_time"] > 5])
+        # Required transfers are fixed by the city, counted at compile time
+        return self.tensors.transfer_count
     
     def _calculate_passengers_reached(self):
         # Mock passenger calculation
-        return np.sum(self.passenger_loads * 0.1)
+        np.multiply(self.passenger_loads, 0.1, out=self._load_scratch)
+        return self._load_scratch.sum()
     
     def _calculate_missed_connections(self, frequencies):
         # Mock missed connection calculation
@@ -103,13 +154,76 @@ class RLTrainer:
         self.city_data = city_data
         self.log_dir = log_dir
         self.env = TransitEnv(city_data)
+        # Compiled once and shared by every rollout env
+        self.tensors = self.env.tensors
+        self.shared_city = None
         
-    def train(self, episodes: int = 1000):
+    def make_vec_env(self, n_envs: int, vec_env: str = "subproc", seed: int = None):
+        """Vectorized TransitEnvs for rollouts.
+
+        "subproc" steps each env in its own worker process, "dummy" steps
+        them in turn in this process, and "batched" uses one
+        BatchedTransitEnv that steps them all as array operations. Env i
+        is seeded with seed + i.
+        """
+        if vec_env == "batched":
+            env = BatchedTransitEnv(self.tensors, n_envs=n_envs)
+            if seed is not None:
+                env.seed(seed)
+            return env
+        vec_env_classes = {"subproc": SubprocVecEnv, "dummy": DummyVecEnv}
+        if vec_env not in vec_env_classes:
+            raise ValueError(f"Unknown vec_env: {vec_env}")
+        # One subprocess gives no parallelism, only IPC overhead
+        vec_env_cls = DummyVecEnv if n_envs == 1 else vec_env_classes[vec_env]
+        if vec_env_cls is SubprocVecEnv:
+            # Workers attach to one shared copy instead of unpickling the city each
+            if self.shared_city is None:
+                self.shared_city = SharedCity(self.tensors)
+            env_city = self.shared_city.handle
+        else:
+            env_city = self.tensors
+        return make_vec_env(
+            TransitEnv,
+            n_envs=n_envs,
+            seed=seed,
+            env_kwargs={"city_data": env_city},
+            vec_env_cls=vec_env_cls
+        )
+    
+    def close(self):
+        """Release the shared city memory published for subprocess envs."""
+        if self.shared_city is not None:
+            self.shared_city.close()
+            self.shared_city = None
+    
+    def train(self, episodes: int = 1000, n_envs: int = None, vec_env: str = "subproc", seed: int = None):
+        """Train PPO with rollouts collected from n_envs parallel envs (default: one per core).
+
+        The rollout env is closed before returning. A model trained on
+        subprocess envs is re-bound to n_envs in-process envs, so it can
+        keep learning.
+        """
+        if n_envs is None:
+            n_envs = os.cpu_count() or 1
+        
+        env = None
         try:
+            env = self.make_vec_env(n_envs, vec_env=vec_env, seed=seed)
+            
+            # Keep each rollout near PPO's default 2048 steps whatever n_envs
+            # is, rounded so it splits into whole minibatches
+            step = PPO_BATCH_SIZE // math.gcd(PPO_BATCH_SIZE, n_envs)
+            n_steps = max(64, 2048 // n_envs)
+            n_steps -= n_steps % step
+            
             # Create PPO model with simplified parameters for prototype
             model = PPO(
                 "MlpPolicy",
-                self.env,
+                env,
+                n_steps=n_steps,
+                batch_size=PPO_BATCH_SIZE,
+                seed=seed,
                 verbose=1,
                 tensorboard_log=self.log_dir
             )
@@ -119,11 +233,15 @@ class RLTrainer:
             
             # For prototype, limit episodes if needed
             actual_episodes = min(episodes, 10000)
-            print(f"Training for {actual_episodes} timesteps...")
+            print(f"Training for {actual_episodes} timesteps on {n_envs} {vec_env} envs...")
             
             model.learn(total_timesteps=actual_episodes, callback=callback)
             print("Training complete")
             
+            if isinstance(env, SubprocVecEnv):
+                # The workers stop below; keep the returned model trainable in-process
+                model.set_env(self.make_vec_env(n_envs, vec_env="dummy", seed=seed))
+            
             return model
             
         except Exception as e:
@@ -137,6 +255,10 @@ class RLTrainer:
                 verbose=0,
                 tensorboard_log=self.log_dir
             )
+        finally:
+            # Stop rollout workers; generate_schedule only uses self.env
+            if env is not None:
+                env.close()
     
     def save_model(self, model, filename: str):
         try:
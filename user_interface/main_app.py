@@ -7,9 +7,16 @@ import plotly.express as px
 import plotly.graph_objects as go
 from PIL import Image
 import cv2
+import os
+import sys
 import time
 from pathlib import Path
 
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from city_generator.city_graph import CityGraph
+
 class CityVisualizer:
     def __init__(self, city_data: dict):
         self.city_data = city_data
@@ -17,6 +24,7 @@ class CityVisualizer:
         self.stations = city_data["stations"]
         self.zones = city_data["zones"]
         self.connections = city_data["connections"]
+        self.graph = CityGraph.from_city(city_data)
     
     def draw_city_map(self):
         # Create grid
@@ -53,16 +61,11 @@ class CityVisualizer:
             size = 15 if station.get("is_transfer", False) else 10
             cv2.circle(img, (x, y), size, color, -1)
         
-        # Draw connections
-        for conn in self.connections:
-            # Find stations
-            s1 = next(s for s in self.stations if s["id"] == conn["from"])
-            s2 = next(s for s in self.stations if s["id"] == conn["to"])
-            
-            x1, y1 = s1["x"] * 100 + 50, s1["y"] * 100 + 50
-            x2, y2 = s2["x"] * 100 + 50, s2["y"] * 100 + 50
-            
-            cv2.line(img, (x1, y1), (x2, y2), (100, 100, 100), 2, cv2.LINE_AA)
+        # Draw connections from the compiled graph's pixel coordinates
+        px = (self.graph.x * 100 + 50).tolist()
+        py = (self.graph.y * 100 + 50).tolist()
+        for i, j in zip(self.graph.edge_from.tolist(), self.graph.edge_to.tolist()):
+            cv2.line(img, (px[i], py[i]), (px[j], py[j]), (100, 100, 100), 2, cv2.LINE_AA)
         
         return img
 